@@ -0,0 +1,137 @@
+"""
+Performans Olcumu
+Tekil `infer` ile toplu motor ve sutunlu (Parquet) skorlama karsilastirmasi
+"""
+
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from heart_disease_fuzzy_system import MamdaniFIS, RULES_FILE, CATEGORY_CENTERS
+from telemetry import RuleFiringStats
+
+
+def random_columns(fis, n, seed=0):
+    """Degisken evrenleri icinde duzgun dagilimli rastgele hasta sutunlari"""
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(var.universe[0], var.universe[-1], n)
+            for name, var in fis.variables.items()}
+
+
+def timed(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_infer(fis, n=200):
+    columns = random_columns(fis, n)
+    rows = [{var: float(col[i]) for var, col in columns.items()} for i in range(n)]
+    return n / timed(lambda: [fis.infer(row) for row in rows], repeat=1)
+
+
+def bench_infer_batch(fis, n=20000):
+    columns = random_columns(fis, n)
+    return n / timed(lambda: fis.infer_batch(columns))
+
+
+def categorical_cohort(n, seed=0):
+    """`infer_categorical` merkezlerinden olusan kohort (en fazla 4,320 farkli satir)"""
+    rng = np.random.default_rng(seed)
+    return {var: rng.choice(list(centers.values()), n) for var, centers in CATEGORY_CENTERS.items()}
+
+
+def bench_infer_batch_dedup(fis, n=100000):
+    """Kategorik kohortta tekillestirmeli `infer_batch`; (hasta/sn, ayiklama orani)"""
+    columns = categorical_cohort(n)
+    stats = {}
+    rate = n / timed(lambda: fis.infer_batch(columns, dedup=True, stats=stats), repeat=1)
+    return rate, stats['dedup_ratio']
+
+
+def bench_infer_batch_rule_stats(fis, n=20000):
+    """Kural atesleme istatistikleri acikken `infer_batch`"""
+    columns = random_columns(fis, n)
+    fis.rule_stats = RuleFiringStats.for_fis(fis)
+    try:
+        return n / timed(lambda: fis.infer_batch(columns))
+    finally:
+        fis.rule_stats = None
+
+
+def bench_infer_tsk_batch(fis, n=20000):
+    columns = random_columns(fis, n)
+    return n / timed(lambda: fis.infer_tsk_batch(columns))
+
+
+def bench_classify_batch(fis, n=20000):
+    columns = random_columns(fis, n)
+    fis.classify_stats = dict.fromkeys(fis.classify_stats, 0)
+    rate = n / timed(lambda: fis.classify_batch(columns))
+    stats = fis.classify_stats
+    fired = stats['early_exit'] + stats['full']
+    return rate, stats['early_exit'] / fired if fired else 0.0
+
+
+def bench_infer_uncertain(fis, n_patients=20, n_samples=1000):
+    """Monte Carlo ornegi/sn (hasta/sn icin ornek sayisina bolunur)"""
+    columns = random_columns(fis, n_patients)
+    noise = {'HbA1c': 0.15, 'LDL': 6.0, 'HDL': 2.5, 'BloodPressure': 6.0, 'HeartRate': 4.0}
+    return n_patients * n_samples / timed(
+        lambda: fis.infer_uncertain_batch(columns, noise, n_samples, seed=0), repeat=1)
+
+
+def bench_threads(fis, n=40000, workers=(1, 2, 4, 8), chunk_size=2048):
+    """Paylasilan `CompiledFIS` ile is parcacigi sayisina gore hasta/sn"""
+    compiled = fis.compile()
+    columns = random_columns(fis, n)
+    rates = {}
+    for count in workers:
+        with ThreadPoolExecutor(count) as executor:
+            rates[count] = n / timed(lambda: compiled.infer_batch(columns, chunk_size, executor=executor))
+    return rates
+
+
+def bench_parquet(fis, n=100000):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from columnar import score_parquet
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "in.parquet")
+        target = os.path.join(tmp, "out.parquet")
+        pq.write_table(pa.table(random_columns(fis, n)), source)
+        return n / timed(lambda: score_parquet(fis, source, target), repeat=1)
+
+
+def main():
+    fis = MamdaniFIS()
+    fis.load_rules(RULES_FILE)
+    print(f"Kural sayisi: {len(fis.rules)}")
+    print(f"{'Yol':28} {'hasta/sn':>12}")
+    print(f"{'infer (tekil)':28} {bench_infer(fis):>12,.0f}")
+    print(f"{'infer_batch':28} {bench_infer_batch(fis):>12,.0f}")
+    print(f"{'infer_batch(rule_stats)':28} {bench_infer_batch_rule_stats(fis):>12,.0f}")
+    rate, ratio = bench_infer_batch_dedup(fis)
+    print(f"{'infer_batch(dedup=True)':28} {rate:>12,.0f}   (kategorik kohort, {ratio:.1f} satir/tekil satir)")
+    print(f"{'infer_tsk_batch':28} {bench_infer_tsk_batch(fis):>12,.0f}")
+    rate, early = bench_classify_batch(fis)
+    print(f"{'classify_batch':28} {rate:>12,.0f}   (erken cikis: %{early * 100:.1f})")
+    rate = bench_infer_uncertain(fis)
+    print(f"{'infer_uncertain_batch':28} {rate:>12,.0f}   (ornek/sn; 1000 ornekle {rate / 1000:,.1f} hasta/sn)")
+    print(f"{'score_parquet':28} {bench_parquet(fis):>12,.0f}")
+    
+    rates = bench_threads(fis)
+    print(f"\nCompiledFIS.infer_batch, is parcacigi olceklenmesi ({os.cpu_count()} cekirdek):")
+    for count, rate in rates.items():
+        print(f"{f'{count} is parcacigi':28} {rate:>12,.0f}   (x{rate / rates[1]:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Sutunlu Skorlama (Arrow / Parquet)
+Degisken basina bir sutun iceren tablolari dogrudan toplu cikarim motoruna verir
+"""
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from heart_disease_fuzzy_system import RISK_CATEGORIES
+
+SCORE_COLUMN = "RiskScore"
+CATEGORY_COLUMN = "RiskCategory"
+
+
+def _column_values(array):
+    """Arrow dizisini float64 NumPy dizisine cevirir; null'lar NaN olur.
+
+    Null icermeyen tek parcali float64 sutunlar kopyalanmadan kullanilir.
+    """
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks() if array.num_chunks != 1 else array.chunk(0)
+    if pa.types.is_dictionary(array.type):
+        array = array.dictionary_decode()
+    if not (pa.types.is_floating(array.type) or pa.types.is_integer(array.type)
+            or pa.types.is_decimal(array.type)):
+        raise TypeError(f"Sayisal olmayan sutun tipi: {array.type}")
+    if array.type != pa.float64():
+        array = pc.cast(array, pa.float64())
+    if array.null_count:
+        array = pc.fill_null(array, np.nan)
+    return array.to_numpy(zero_copy_only=False)
+
+
+def batch_columns(batch, variables):
+    """RecordBatch/Table icindeki model degiskenlerini {ad: ndarray} olarak dondurur"""
+    names = set(batch.schema.names)
+    return {var: _column_values(batch.column(var)) for var in variables if var in names}
+
+
+def _result_arrays(scores, codes):
+    categories = pa.DictionaryArray.from_arrays(pa.array(codes, type=pa.int8()),
+                                                pa.array(RISK_CATEGORIES))
+    return pa.array(scores, type=pa.float64()), categories
+
+
+def score_batch(fis, batch, keep_inputs=True, chunk_size=1024):
+    """Tek bir RecordBatch'i skorlar; skor ve kategori sutunlari eklenmis batch dondurur"""
+    scores, codes = fis.infer_batch(batch_columns(batch, fis.variables), chunk_size=chunk_size)
+    score_array, category_array = _result_arrays(scores, codes)
+    if keep_inputs:
+        arrays, names = list(batch.columns), list(batch.schema.names)
+    else:
+        arrays, names = [], []
+    return pa.RecordBatch.from_arrays(arrays + [score_array, category_array],
+                                      names=names + [SCORE_COLUMN, CATEGORY_COLUMN])
+
+
+def score_table(fis, table, keep_inputs=True, max_chunksize=65536, chunk_size=1024):
+    """Arrow tablosunu skorlar; RiskScore (float64) ve RiskCategory (dictionary) ekler"""
+    batches = (table.to_batches(max_chunksize=max_chunksize)
+               or [pa.RecordBatch.from_pylist([], schema=table.schema)])
+    return pa.Table.from_batches([score_batch(fis, b, keep_inputs, chunk_size) for b in batches])
+
+
+def score_parquet(fis, source, destination, batch_size=65536, keep_inputs=True,
+                  chunk_size=1024, compression="snappy"):
+    """Parquet dosyasini parca parca okuyup skorlar ve sonucu Parquet olarak yazar.
+
+    Bellek kullanimi dosya boyutundan bagimsizdir; yalnizca model degiskenleri
+    (ve `keep_inputs` ise diger sutunlar) okunur. Yazilan satir sayisini dondurur;
+    girdi bos olsa da hedef dosya (bos tablo) yazilir.
+    """
+    reader = pq.ParquetFile(source)
+    schema = reader.schema_arrow
+    columns = None
+    if not keep_inputs:
+        columns = [name for name in schema.names if name in fis.variables]
+        schema = pa.schema([schema.field(name) for name in columns])
+
+    # Cikti semasi bos bir batch skorlanarak elde edilir
+    empty = score_batch(fis, pa.RecordBatch.from_pylist([], schema=schema), keep_inputs, chunk_size)
+    writer = pq.ParquetWriter(destination, empty.schema, compression=compression)
+    n_rows = 0
+    try:
+        for batch in reader.iter_batches(batch_size=batch_size, columns=columns):
+            scored = score_batch(fis, batch, keep_inputs, chunk_size)
+            writer.write_batch(scored)
+            n_rows += scored.num_rows
+    finally:
+        writer.close()
+    return n_rows
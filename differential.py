@@ -0,0 +1,334 @@
+"""
+Fark Testi (Differential Testing)
+Referans `MamdaniFIS.infer` ile diger cikarim yollarinin ve gui.py kopyasinin karsilastirilmasi
+"""
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from heart_disease_fuzzy_system import (MamdaniFIS, RULES_FILE, RISK_CATEGORIES,
+                                        CATEGORY_CENTERS)
+from score_range import BoxBounds
+
+SCORE_TOLERANCE = 1e-9
+
+
+def _kinks(var):
+    """Orneklenmis uyelik fonksiyonlarinin kirilma noktalari ve evren sinirlari"""
+    points = {float(var.universe[0]), float(var.universe[-1])}
+    for mf in var.mfs.values():
+        bends = np.flatnonzero(np.abs(np.diff(mf, 2)) > 1e-12) + 1
+        points.update(float(v) for v in var.universe[bends])
+    return sorted(points)
+
+
+def generate_inputs(fis, n_random=500, seed=0):
+    """Rastgele ve uc durum girdilerinden olusan sutunlar (NaN = eksik girdi)"""
+    rng = np.random.default_rng(seed)
+    names = list(fis.variables)
+    lows = {v: float(fis.variables[v].universe[0]) for v in names}
+    highs = {v: float(fis.variables[v].universe[-1]) for v in names}
+    kinks = {v: _kinks(fis.variables[v]) for v in names}
+
+    def uniform(n, margin=0.0):
+        return {v: rng.uniform(lows[v] - margin * (highs[v] - lows[v]),
+                               highs[v] + margin * (highs[v] - lows[v]), n) for v in names}
+
+    blocks = [uniform(n_random, margin=0.1)]
+
+    # Tek degisken kirilma noktasinda (ve hemen yaninda), digerleri rastgele
+    for v in names:
+        edges = np.array(kinks[v])
+        values = np.concatenate([edges, edges - 1e-9, edges + 1e-9,
+                                 [lows[v] - 10, highs[v] + 10, np.nan]])
+        block = uniform(len(values))
+        block[v] = values
+        blocks.append(block)
+
+    # Tum degiskenler kirilma noktalarinda
+    blocks.append({v: rng.choice(kinks[v], n_random // 2) for v in names})
+
+    # infer_categorical merkezleri
+    n = n_random // 2
+    blocks.append({v: rng.choice(list(CATEGORY_CENTERS[v].values()), n) if v in CATEGORY_CENTERS
+                   else uniform(n)[v] for v in names})
+
+    # Eksik girdiler: her satirda rastgele degiskenler yok, ayrica tek degiskenli satirlar
+    block = uniform(n_random // 4)
+    for v in names:
+        block[v][rng.random(n_random // 4) < 0.3] = np.nan
+    blocks.append(block)
+    single = {v: np.full(len(names), np.nan) for v in names}
+    for i, v in enumerate(names):
+        single[v][i] = rng.uniform(lows[v], highs[v])
+    blocks.append(single)
+
+    return {v: np.concatenate([b[v] for b in blocks]) for v in names}
+
+
+def rows(columns):
+    """Sutunlari `infer` icin satir sozluklerine cevirir; NaN girdiler atlanir"""
+    names = list(columns)
+    n = len(columns[names[0]])
+    return [{v: float(columns[v][i]) for v in names if not np.isnan(columns[v][i])}
+            for i in range(n)]
+
+
+def _row_engine(infer):
+    def run(fis, columns):
+        results = [infer(row) for row in rows(columns)]
+        scores = np.array([float(r[0]) for r in results])
+        codes = np.array([RISK_CATEGORIES.index(r[1]) for r in results], dtype=np.int8)
+        return scores, codes
+    return run
+
+
+def reference(fis, columns):
+    return _row_engine(fis.infer)(fis, columns)
+
+
+def tsk_reference(fis, columns):
+    return _row_engine(fis.infer_tsk)(fis, columns)
+
+
+def _classify_rows(fis, columns):
+    return None, np.array([RISK_CATEGORIES.index(fis.classify(row)) for row in rows(columns)],
+                          dtype=np.int8)
+
+
+def _compiled_threads(fis, columns, workers=4):
+    with ThreadPoolExecutor(workers) as executor:
+        return fis.compile().infer_batch(columns, chunk_size=64, executor=executor)
+
+
+# Her yol (skorlar veya yalnizca kategori uretiyorsa None, kategori indeksleri) dondurur
+ENGINES = {
+    'infer_batch': lambda fis, columns: fis.infer_batch(columns),
+    'infer_batch[chunk=7]': lambda fis, columns: fis.infer_batch(columns, chunk_size=7),
+    'infer_batch[dedup]': lambda fis, columns: fis.infer_batch(columns, dedup=True),
+    'classify_batch': lambda fis, columns: (None, fis.classify_batch(columns)),
+    'classify': _classify_rows,
+    'compiled.infer_batch': lambda fis, columns: fis.compile().infer_batch(columns),
+    'compiled[threads=4]': _compiled_threads,
+    'compiled.classify_batch': lambda fis, columns: (None, fis.compile().classify_batch(columns)),
+    'compiled.classify[dedup]': lambda fis, columns: (
+        None, fis.compile().classify_batch(columns, dedup=True)),
+}
+
+# TSK yollari tekil `infer_tsk` referansiyla karsilastirilir
+TSK_ENGINES = {
+    'infer_tsk_batch': lambda fis, columns: fis.infer_tsk_batch(columns),
+    'infer_tsk_batch[chunk=7]': lambda fis, columns: fis.infer_tsk_batch(columns, chunk_size=7),
+    'infer_tsk_batch[dedup]': lambda fis, columns: fis.infer_tsk_batch(columns, dedup=True),
+    'compiled.infer_tsk_batch': lambda fis, columns: fis.compile().infer_tsk_batch(columns),
+}
+
+
+def compare(ref_scores, ref_codes, scores, codes):
+    if scores is None:
+        scores = ref_scores
+    deviation = np.abs(np.asarray(scores) - ref_scores)
+    deviation[np.isnan(deviation) & (np.isnan(scores) == np.isnan(ref_scores))] = 0.0
+    worst = int(np.nanargmax(deviation)) if len(deviation) else -1
+    return {
+        'max_deviation': float(deviation[worst]) if worst >= 0 else 0.0,
+        'worst_row': worst,
+        'category_disagreements': np.flatnonzero(np.asarray(codes) != ref_codes),
+    }
+
+
+def membership_differences(fis, gui_fis, columns):
+    """gui.py bulaniklastirmasinin referanstan sapmasi.
+    
+    {(degisken, terim): (maks. sapma, o andaki girdi, destek uyusmazligi sayisi)};
+    destek uyusmazligi bir tarafta 0, digerinde 0'dan buyuk uyeliktir ve kuralin
+    atesleyip atesmemesini degistirdigi icin kucuk sapmalar bile skoru etkileyebilir.
+    """
+    diffs = {}
+    for name, var in fis.variables.items():
+        values = columns[name][~np.isnan(columns[name])]
+        for term, mf in var.mfs.items():
+            ref = np.interp(values, var.universe, mf, left=0.0, right=0.0)
+            gui = np.array([gui_fis.fuzzify(name, x).get(term, 0.0) for x in values])
+            dev = np.abs(gui - ref)
+            i = int(np.argmax(dev))
+            support = int(np.sum((gui > 0) != (ref > 0)))
+            diffs[(name, term)] = (float(dev[i]), float(values[i]), support)
+    return diffs
+
+
+def gui_domain(columns):
+    """GUI'nin uretebilecegi girdiler: kaydirici araliklari ve 0-3 arasi tamsayi gogus agrisi"""
+    import gui
+    mask = np.ones(len(next(iter(columns.values()))), dtype=bool)
+    for name, info in gui.VARIABLES.items():
+        x = columns[name]
+        lo, hi = info['range']
+        mask &= (x >= lo) & (x <= hi)
+        if info.get('type') == 'combo':
+            mask &= x == np.round(x)
+    return mask
+
+
+def run(fis=None, n_random=500, seed=0, engines=None, tsk_engines=None, include_gui=True,
+        n_boxes=100):
+    if fis is None:
+        fis = MamdaniFIS()
+        fis.load_rules(RULES_FILE)
+    engines = ENGINES if engines is None else engines
+    tsk_engines = TSK_ENGINES if tsk_engines is None else tsk_engines
+    columns = generate_inputs(fis, n_random, seed)
+    ref_scores, ref_codes = reference(fis, columns)
+
+    report = {'n_inputs': len(ref_scores), 'engines': {}, 'tsk_engines': {}}
+    for name, engine in engines.items():
+        scores, codes = engine(fis, columns)
+        report['engines'][name] = compare(ref_scores, ref_codes, scores, codes)
+
+    if tsk_engines:
+        tsk_scores, tsk_codes = tsk_reference(fis, columns)
+        for name, engine in tsk_engines.items():
+            scores, codes = engine(fis, columns)
+            report['tsk_engines'][name] = compare(tsk_scores, tsk_codes, scores, codes)
+
+    if n_boxes:
+        report['bounds'] = check_box_bounds(fis, n_boxes, seed=seed)
+
+    if include_gui:
+        import gui
+        gui_fis = gui.MamdaniFIS()
+        scores, codes = _row_engine(gui_fis.infer)(gui_fis, columns)
+        inside = gui_domain(columns)
+        full = compare(ref_scores, ref_codes, scores, codes)
+        domain = compare(ref_scores[inside], ref_codes[inside], scores[inside], codes[inside])
+        report['gui'] = {'all_inputs': full, 'gui_inputs': domain, 'n_gui_inputs': int(inside.sum()),
+                         'memberships': membership_differences(fis, gui_fis, columns)}
+    report['columns'] = columns
+    return report
+
+
+# Orneklenmis HbA1c evreninde 6.5 noktasi 6.4999... olarak kalir ve VeryHealthy uyeligi
+# 6.5-6.6 arasinda ~1e-15'tir. Bu kutuda VeryHealthy kurallari cok kucuk aktivasyonla
+# atesler ve birlesik alan eps mertebesine iner; sinirlarin bu olcekte de gecerli kalmasi denetlenir.
+REGRESSION_BOXES = [
+    {'Age': (38.3, 56.8), 'HbA1c': (6.52, 7.00), 'LDL': (122.6, 139.0), 'HDL': (54.0, 64.9),
+     'HeartRate': (136.4, 166.2), 'BloodPressure': (125.9, 148.4), 'ChestPain': (1.80, 2.05)},
+]
+
+
+def random_boxes(fis, n_boxes, seed=0):
+    """Rastgele girdi kutulari; yarisi bir MF kirilma noktasini icerecek sekilde kucuk tutulur"""
+    rng = np.random.default_rng(seed)
+    names = list(fis.variables)
+    lows, highs = {}, {}
+    for v in names:
+        u = fis.variables[v].universe
+        span = u[-1] - u[0]
+        center = rng.uniform(u[0], u[-1], n_boxes)
+        near = rng.random(n_boxes) < 0.5
+        center[near] = rng.choice(_kinks(fis.variables[v]), int(near.sum()))
+        width = span * rng.uniform(0.0, 0.25, n_boxes) * np.where(near, 0.1, 1.0)
+        lows[v] = np.clip(center - width * rng.random(n_boxes), u[0], u[-1])
+        highs[v] = np.clip(lows[v] + width, u[0], u[-1])
+    for box in REGRESSION_BOXES:
+        for v in names:
+            lows[v] = np.append(lows[v], box[v][0])
+            highs[v] = np.append(highs[v], box[v][1])
+    return lows, highs
+
+
+def check_box_bounds(fis, n_boxes=100, n_samples=200, seed=0):
+    """`BoxBounds.score_bounds` sinirlarinin kutulardan orneklenen `infer_batch` skorlariyla kontrolu.
+    
+    Orneklere kutudaki MF kirilma noktalari (uyeligin uc degerleri) de
+    eklenir. En buyuk ihlal, ihlal eden kutular ve kontrol edilen nokta
+    sayisi dondurulur.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(fis.variables)
+    lows, highs = random_boxes(fis, n_boxes, seed)
+    lower, upper = BoxBounds(fis.compile()).score_bounds(lows, highs)
+    n = len(lower)
+    
+    box_ids = np.repeat(np.arange(n), n_samples)
+    points = {v: rng.uniform(lows[v][box_ids], highs[v][box_ids]) for v in names}
+    for i, v in enumerate(names):
+        kinks = np.array(_kinks(fis.variables[v]))
+        # Her kutuda bir ornek: bu degisken kutudaki bir kirilma noktasinda
+        rows = np.arange(n) * n_samples + i % n_samples
+        inside = (kinks[None, :] >= lows[v][:, None]) & (kinks[None, :] <= highs[v][:, None])
+        pick = np.argmax(inside * rng.random(inside.shape), axis=1)
+        has = inside.any(axis=1)
+        points[v][rows[has]] = kinks[pick[has]]
+    scores, _ = fis.infer_batch(points)
+    excess = np.maximum(lower[box_ids] - scores, scores - upper[box_ids])
+    worst = np.zeros(n)
+    np.maximum.at(worst, box_ids, excess)
+    return {'max_violation': float(max(worst.max(), 0.0)),
+            'violating_boxes': np.flatnonzero(worst > SCORE_TOLERANCE),
+            'n_points': len(scores)}
+
+
+def _failed(result):
+    return bool(len(result['category_disagreements'])) or result['max_deviation'] > SCORE_TOLERANCE
+
+
+def _print_comparison(name, result, columns):
+    status = "FARK" if _failed(result) else "OK"
+    print(f"{name:28} {result['max_deviation']:>14.3e} {len(result['category_disagreements']):>10}  {status}")
+    if status == "FARK" and result['worst_row'] >= 0:
+        row = {v: round(float(c[result['worst_row']]), 6) for v, c in columns.items()}
+        print(f"{'':28} en buyuk sapma girdisi: {row}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cikarim yollarini referans infer ile karsilastirir")
+    parser.add_argument("--samples", type=int, default=500, help="rastgele girdi sayisi")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-gui", action="store_true", help="gui.py kopyasini atla")
+    parser.add_argument("--boxes", type=int, default=100,
+                        help="aralik sinirlari icin rastgele kutu sayisi (0: atla)")
+    args = parser.parse_args(argv)
+
+    report = run(n_random=args.samples, seed=args.seed, include_gui=not args.no_gui,
+                 n_boxes=args.boxes)
+    columns = report['columns']
+    print(f"Girdi sayisi: {report['n_inputs']}")
+    print(f"{'Yol':28} {'maks. sapma':>14} {'kategori':>10}")
+    failed = False
+    for name, result in report['engines'].items():
+        _print_comparison(name, result, columns)
+        failed |= _failed(result)
+
+    if report['tsk_engines']:
+        print("\nTSK yollari (referans: infer_tsk):")
+        for name, result in report['tsk_engines'].items():
+            _print_comparison(name, result, columns)
+            failed |= _failed(result)
+
+    if 'bounds' in report:
+        b = report['bounds']
+        status = "FARK" if len(b['violating_boxes']) else "OK"
+        print(f"\nAralik sinirlari (BoxBounds, {b['n_points']} ornek): "
+              f"maks. ihlal {b['max_violation']:.3e}, ihlal eden kutu {len(b['violating_boxes'])}  {status}")
+        failed |= bool(len(b['violating_boxes']))
+
+    if 'gui' in report:
+        g = report['gui']
+        print("\ngui.py MamdaniFIS kopyasi:")
+        _print_comparison("gui.infer (tum girdiler)", g['all_inputs'], columns)
+        inside = {v: c[gui_domain(columns)] for v, c in columns.items()}
+        _print_comparison(f"gui.infer (GUI araligi, {g['n_gui_inputs']})", g['gui_inputs'], inside)
+        deviating = {k: v for k, v in g['memberships'].items() if v[0] > 0 or v[2]}
+        print(f"Uyelik sapmalari: {'yok' if not deviating else ''}")
+        for (var, term), (dev, value, support) in deviating.items():
+            print(f"  {var:14} {term:12} {dev:.3e}  (x = {value:g}), destek uyusmazligi: {support}")
+        failed |= bool(len(g['all_inputs']['category_disagreements']))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,14 +3,20 @@ Kalp Hastalığı Risk Tahmin Sistemi - GUI
 Gerçek Mamdani FIS + Hibrit Durulaştırma
 """
 
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import numpy as np
 import pandas as pd
 import skfuzzy as fuzz
 
+import heart_disease_fuzzy_system as batch_engine
+
 RULES_FILE = "inference_rules_corrected.csv"
 
+LABEL_COLUMNS = ("Label", "Category", "RiskCategory", "Risk", "Sonuç")
+
 TYPO_CORRECTIONS = {
     "HIgh": "High", "VeryHIgh": "VeryHigh", "XHIgh": "XHigh",
     "Normal": "Medium", "A typical": "Atypical", 
@@ -85,6 +91,10 @@ class MamdaniFIS:
     
     def __init__(self):
         self.rules = []
+        # Bulanıklaştırma evrenleri ve durulaştırma çekirdeği ana modülle ortak (bkz. differential.py)
+        base = batch_engine.MamdaniFIS()
+        self.variables = base.variables
+        self.defuzzifier = base.compile()
         self.risk_universe = np.arange(0, 10.01, 0.01)
         self.risk_mfs = {
             'Healthy': fuzz.trimf(self.risk_universe, [0, 1.5, 3]),
@@ -118,19 +128,10 @@ class MamdaniFIS:
     
     def fuzzify(self, var_name, value):
         """Sayısal değerin tüm kümelerdeki üyelik derecelerini hesaplar"""
-        if var_name not in VARIABLES or "mfs" not in VARIABLES[var_name]:
+        if var_name not in VARIABLES or var_name not in self.variables:
             return {}
         
-        mfs = VARIABLES[var_name]["mfs"]
-        min_val, max_val = VARIABLES[var_name]["range"]
-        universe = np.arange(min_val, max_val + 0.1, 0.1)
-        
-        memberships = {}
-        for term, params in mfs.items():
-            mf = fuzz.trimf(universe, params)
-            memberships[term] = float(fuzz.interp_membership(universe, mf, value))
-        
-        return memberships
+        return self.variables[var_name].fuzzify(value)
     
     def infer(self, numeric_inputs):
         """Tam Mamdani çıkarım süreci"""
@@ -165,19 +166,11 @@ class MamdaniFIS:
                 clipped = np.minimum(rule['activation'], self.risk_mfs[rule['consequent']])
                 aggregated = np.maximum(aggregated, clipped)
             
-            # 4. Hibrit durulaştırma
+            # 4. Hibrit durulaştırma (centroid, bisector ve MOM ortalaması)
             if np.sum(aggregated) == 0:
                 score = self._calculate_risk_score(fuzzified)
             else:
-                results = []
-                for method in ['centroid', 'bisector', 'mom']:
-                    try:
-                        r = fuzz.defuzz(self.risk_universe, aggregated, method)
-                        if not np.isnan(r):
-                            results.append(r)
-                    except:
-                        pass
-                score = np.mean(results) if results else self._calculate_risk_score(fuzzified)
+                score = float(self.defuzzifier.defuzzify_hybrid_batch(aggregated[None])[0])
         
         # Sınıflandırma
         if score < 3:
@@ -216,6 +209,217 @@ class MamdaniFIS:
         return min(normalized, 10)
 
 
+_batch_fis = None
+_batch_fis_lock = threading.Lock()
+
+
+def get_batch_fis():
+    """Toplu skorlama motorunu ilk kullanımda bir kez yükler"""
+    global _batch_fis
+    with _batch_fis_lock:
+        if _batch_fis is None:
+            fis = batch_engine.MamdaniFIS()
+            fis.load_rules(RULES_FILE)
+            _batch_fis = fis
+        return _batch_fis
+
+
+def read_batch_csv(path):
+    """Toplu skorlama için CSV okur: (sayısal sütunlar, etiketler veya None, tablo, okunamayanlar).
+    
+    Değişken başına bir sütun (sayısal veya terim adı) içeren dosyalar ya da
+    test verisindeki "Değişken = Terim AND ..." biçimi kabul edilir. Sayı veya
+    bilinen terim adı olmayan dolu hücreler eksik girdi olarak skorlanır;
+    değişken başına sayıları `okunamayanlar` sözlüğünde döner.
+    """
+    df = pd.read_csv(path)
+    centers = batch_engine.CATEGORY_CENTERS
+    unparsed = {}
+    
+    if not any(var in df.columns for var in VARIABLES):
+        cases, labels = batch_engine.load_test_cases(path)
+        if not cases:
+            raise ValueError("Dosyada tanınan değişken sütunu veya kural biçimi bulunamadı")
+        for inputs in cases:
+            for var, term in inputs.items():
+                if term not in centers.get(var, {}):
+                    unparsed[var] = unparsed.get(var, 0) + 1
+        table = pd.DataFrame(cases)
+        table["Label"] = labels
+        return batch_engine.categorical_columns(cases), labels, table, unparsed
+    
+    columns = {}
+    for var in VARIABLES:
+        if var not in df.columns:
+            continue
+        numeric = pd.to_numeric(df[var], errors="coerce")
+        terms = df[var].astype(str).str.strip().map(lambda t: TYPO_CORRECTIONS.get(t, t))
+        values = numeric.fillna(terms.map(centers.get(var, {})))
+        given = df[var].notna() & (df[var].astype(str).str.strip() != "")
+        if (given & values.isna()).any():
+            unparsed[var] = int((given & values.isna()).sum())
+        columns[var] = values.to_numpy(dtype=float)
+    
+    labels = None
+    for name in LABEL_COLUMNS:
+        if name in df.columns:
+            labels = [TYPO_CORRECTIONS.get(str(v).strip(), str(v).strip()) if pd.notna(v) else None
+                      for v in df[name]]
+            break
+    return columns, labels, df, unparsed
+
+
+def run_batch(fis, columns, cancel, progress, chunk_size=500):
+    """Sütunları parça parça skorlar; iptal edilirse None döner"""
+    n = len(next(iter(columns.values())))
+    scores = np.empty(n)
+    codes = np.empty(n, dtype=np.int8)
+    for start in range(0, n, chunk_size):
+        if cancel.is_set():
+            return None
+        end = min(start + chunk_size, n)
+        chunk = {var: values[start:end] for var, values in columns.items()}
+        scores[start:end], codes[start:end] = fis.infer_batch(chunk)
+        progress(end, n)
+    return scores, codes
+
+
+class BatchWindow:
+    """CSV dosyasını arka plan iş parçacığında skorlayan pencere"""
+    
+    def __init__(self, master, path):
+        self.master = master
+        self.path = path
+        self.cancel = threading.Event()
+        self.messages = queue.Queue()
+        self.result = None
+        
+        self.win = tk.Toplevel(master)
+        self.win.title("Toplu Skorlama")
+        self.win.geometry("560x520")
+        self.win.configure(bg="#ECF0F1")
+        self.win.protocol("WM_DELETE_WINDOW", self.close)
+        
+        tk.Label(self.win, text=path, font=("Segoe UI", 8), bg="#ECF0F1", 
+                fg="#7F8C8D", wraplength=520).pack(padx=15, pady=(12, 4))
+        
+        self.progress = ttk.Progressbar(self.win, length=520, mode="determinate")
+        self.progress.pack(padx=15, pady=5)
+        self.status = tk.Label(self.win, text="Kurallar yükleniyor...", font=("Segoe UI", 9),
+                              bg="#ECF0F1", fg="#2C3E50")
+        self.status.pack()
+        
+        self.text = tk.Text(self.win, height=18, font=("Consolas", 9), 
+                           bg="white", fg="#2C3E50", relief="flat")
+        self.text.pack(fill="both", expand=True, padx=15, pady=8)
+        self.text.config(state="disabled")
+        
+        buttons = tk.Frame(self.win, bg="#ECF0F1")
+        buttons.pack(pady=(0, 12))
+        self.cancel_btn = tk.Button(buttons, text="İptal", width=12, command=self.cancel.set)
+        self.cancel_btn.pack(side="left", padx=5)
+        self.export_btn = tk.Button(buttons, text="CSV Dışa Aktar", width=14, 
+                                   state="disabled", command=self.export)
+        self.export_btn.pack(side="left", padx=5)
+        
+        threading.Thread(target=self.work, daemon=True).start()
+        self.master.after(100, self.poll)
+    
+    def work(self):
+        try:
+            fis = get_batch_fis()
+            columns, labels, table, unparsed = read_batch_csv(self.path)
+            self.messages.put(("start", len(table)))
+            result = run_batch(fis, columns, self.cancel,
+                               lambda done, total: self.messages.put(("progress", done, total)))
+            if result is None:
+                self.messages.put(("cancelled",))
+            else:
+                self.messages.put(("done", result, labels, table, unparsed))
+        except Exception as e:
+            self.messages.put(("error", str(e)))
+    
+    def poll(self):
+        if not self.win.winfo_exists():
+            return
+        try:
+            while True:
+                msg = self.messages.get_nowait()
+                if msg[0] == "start":
+                    self.progress.config(maximum=max(msg[1], 1), value=0)
+                    self.status.config(text=f"0 / {msg[1]} hasta")
+                elif msg[0] == "progress":
+                    self.progress.config(value=msg[1])
+                    self.status.config(text=f"{msg[1]} / {msg[2]} hasta")
+                elif msg[0] == "done":
+                    self.show_results(*msg[1:])
+                    return
+                elif msg[0] == "cancelled":
+                    self.status.config(text="İptal edildi")
+                    self.cancel_btn.config(state="disabled")
+                    return
+                elif msg[0] == "error":
+                    self.status.config(text="Hata")
+                    self.cancel_btn.config(state="disabled")
+                    messagebox.showerror("Hata", f"Toplu skorlama başarısız: {msg[1]}", parent=self.win)
+                    return
+        except queue.Empty:
+            pass
+        self.master.after(100, self.poll)
+    
+    def show_results(self, result, labels, table, unparsed):
+        scores, codes = result
+        categories = batch_engine.RISK_CATEGORIES
+        table = table.copy()
+        table["RiskScore"] = scores
+        table["RiskCategory"] = [categories[c] for c in codes]
+        self.result = table
+        
+        counts = np.bincount(codes, minlength=len(categories))
+        lines = [f"Toplam hasta: {len(codes)}", "", "Kategori Dağılımı:"]
+        for cat, count in zip(categories, counts):
+            share = 100 * count / max(len(codes), 1)
+            lines.append(f"  {RISK_INFO[cat]['label']:12} {count:>7}  (%{share:.1f})")
+        
+        if unparsed:
+            lines += ["", "Okunamayan hücreler (eksik girdi olarak skorlandı):"]
+            for var, count in unparsed.items():
+                lines.append(f"  {var:12} {count:>7}")
+        
+        if labels is not None:
+            pairs = [(categories.index(l), c) for l, c in zip(labels, codes) if l in categories]
+            if pairs:
+                cm = np.zeros((len(categories), len(categories)), dtype=int)
+                for true, pred in pairs:
+                    cm[true, pred] += 1
+                accuracy = 100 * np.trace(cm) / len(pairs)
+                lines += ["", f"Doğruluk: %{accuracy:.2f} ({len(pairs)} etiketli hasta)", "",
+                          "Karışıklık Matrisi (satır: gerçek, sütun: tahmin):",
+                          f"{'':12} " + " ".join(f"{c:>10}" for c in categories)]
+                for i, cat in enumerate(categories):
+                    lines.append(f"{cat:12} " + " ".join(f"{v:>10}" for v in cm[i]))
+        
+        self.text.config(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        self.text.config(state="disabled")
+        skipped = sum(unparsed.values())
+        self.status.config(text=f"Tamamlandı, {skipped} hücre okunamadı" if skipped else "Tamamlandı",
+                           fg="#C0392B" if skipped else "#2C3E50")
+        self.cancel_btn.config(state="disabled")
+        self.export_btn.config(state="normal")
+    
+    def export(self):
+        path = filedialog.asksaveasfilename(parent=self.win, defaultextension=".csv",
+                                            filetypes=[("CSV", "*.csv")])
+        if path:
+            self.result.to_csv(path, index=False)
+    
+    def close(self):
+        self.cancel.set()
+        self.win.destroy()
+
+
 class App:
     def __init__(self, root):
         self.root = root
@@ -276,14 +480,22 @@ class App:
                 
                 self.inputs[var] = ("numeric", entry, slider)
         
-        # Tahmin butonu
-        btn = tk.Button(self.root, text="RİSK ANALİZİ YAP", font=("Segoe UI", 12, "bold"),
+        # Tahmin ve toplu skorlama butonları
+        buttons = tk.Frame(self.root, bg="#ECF0F1")
+        buttons.pack(pady=12)
+        
+        btn = tk.Button(buttons, text="RİSK ANALİZİ YAP", font=("Segoe UI", 12, "bold"),
                        bg="#3498DB", fg="white", padx=30, pady=10, 
                        relief="flat", cursor="hand2", command=self.predict)
-        btn.pack(pady=12)
+        btn.pack(side="left", padx=5)
         btn.bind("<Enter>", lambda e: btn.config(bg="#2980B9"))
         btn.bind("<Leave>", lambda e: btn.config(bg="#3498DB"))
         
+        csv_btn = tk.Button(buttons, text="CSV İÇE AKTAR", font=("Segoe UI", 12, "bold"),
+                           bg="#7F8C8D", fg="white", padx=15, pady=10,
+                           relief="flat", cursor="hand2", command=self.import_csv)
+        csv_btn.pack(side="left", padx=5)
+        
         # Bulanıklaştırma sonuçları
         fuzzy_frame = tk.LabelFrame(self.root, text=" Bulanıklaştırma (Fuzzification) ", 
                                    font=("Segoe UI", 10, "bold"), bg="#ECF0F1", 
@@ -330,6 +542,11 @@ class App:
         lbl.pack()
         return lbl
     
+    def import_csv(self):
+        path = filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("Tümü", "*.*")])
+        if path:
+            BatchWindow(self.root, path)
+    
     def update_entry(self, entry, value):
         entry.delete(0, tk.END)
         entry.insert(0, f"{float(value):.1f}")
@@ -3,6 +3,8 @@ Kalp Hastaligi Risk Tahmin Sistemi
 Mamdani Bulanik Cikarim + Hibrit Durulaştirma
 """
 
+from types import MappingProxyType
+
 import numpy as np
 import pandas as pd
 import skfuzzy as fuzz
@@ -20,6 +22,35 @@ TYPO_CORRECTIONS = {
     "Very Healthy": "VeryHealthy", "Very Old": "VeryOld", "ExtraHigh": "XHigh"
 }
 
+RISK_CATEGORIES = ['Healthy', 'LowRisk', 'MediumRisk', 'HighRisk']
+RISK_THRESHOLDS = np.array([3.0, 5.0, 7.0])
+
+RISK_WEIGHTS = {
+    'Age': {'Young': 0, 'Mid': 1, 'Old': 2, 'VeryOld': 3},
+    'BloodPressure': {'Medium': 0, 'High': 1.5, 'VeryHigh': 3},
+    'HbA1c': {'VeryHealthy': 0, 'Healthy': 1, 'High': 2.5},
+    'LDL': {'VeryHealthy': 0, 'Healthy': 0.5, 'High': 1.5, 'VeryHigh': 2, 'XHigh': 2.5},
+    'HDL': {'Healthy': 0, 'Low': 1.5},
+    'HeartRate': {'VeryHealthy': 0, 'Healthy': 0.5, 'High': 1.5},
+    'ChestPain': {'NoPain': 0, 'NonAnginal': 1, 'Atypical': 2, 'Typical': 3}
+}
+
+# Yedek skorun 0-10 araligina normalize edildigi en yuksek toplam
+MAX_RISK_SCORE = sum(max(weights.values()) for weights in RISK_WEIGHTS.values())  # 17
+
+# Sifirinci derece Sugeno (TSK) modunda her sonuc kumesinin tekil degeri (MF tepe noktalari)
+TSK_SINGLETONS = {'Healthy': 1.5, 'LowRisk': 4.0, 'MediumRisk': 6.0, 'HighRisk': 8.5}
+
+CATEGORY_CENTERS = {
+    'Age': {'Young': 35, 'Mid': 55, 'Old': 72, 'VeryOld': 90},
+    'HbA1c': {'VeryHealthy': 5.2, 'Healthy': 7.5, 'High': 10},
+    'LDL': {'VeryHealthy': 65, 'Healthy': 90, 'High': 125, 'VeryHigh': 165, 'XHigh': 210},
+    'HDL': {'Low': 32, 'Healthy': 60},
+    'HeartRate': {'VeryHealthy': 62, 'Healthy': 82, 'High': 130},
+    'BloodPressure': {'Medium': 100, 'High': 135, 'VeryHigh': 175},
+    'ChestPain': {'NoPain': 0, 'NonAnginal': 1, 'Atypical': 2, 'Typical': 3}
+}
+
 
 class FuzzyVariable:
     def __init__(self, name, universe, mfs):
@@ -33,9 +64,17 @@ class FuzzyVariable:
 
 
 class MamdaniFIS:
-    def __init__(self):
+    def __init__(self, telemetry=None, rule_stats=None):
         self.variables = {}
+        self._rules_version = 0
         self.rules = []
+        self.telemetry = telemetry
+        self.rule_stats = rule_stats
+        self.tsk_singletons = dict(TSK_SINGLETONS)
+        self.classify_stats = {'calls': 0, 'no_rule': 0, 'early_exit': 0, 'full': 0}
+        self._compiled = None
+        self._compiled_fis = None
+        self._engine_key = None
         self.risk_universe = np.arange(0, 10.01, 0.01)
         self.risk_mfs = {
             'Healthy': fuzz.trimf(self.risk_universe, [0, 1.5, 3]),
@@ -45,6 +84,20 @@ class MamdaniFIS:
         }
         self._define_variables()
     
+    @property
+    def rules(self):
+        return self._rules
+    
+    @rules.setter
+    def rules(self, rules):
+        # Yeni liste atanmasi derlenmis onbellekleri gecersiz kilar (`_rules_key`)
+        self._rules = rules
+        self._rules_version += 1
+    
+    def _rules_key(self):
+        """Kural tabani surumu: liste her atandiginda (load_rules dahil) ve uzunluk degisince degisir"""
+        return self._rules_version, len(self._rules)
+    
     def _define_variables(self):
         self.variables['Age'] = FuzzyVariable('Age', np.arange(20, 101, 1),
             {'Young': [20, 32, 45], 'Mid': [40, 52, 65], 'Old': [60, 72, 85], 'VeryOld': [80, 95, 100]})
@@ -71,6 +124,9 @@ class MamdaniFIS:
     
     def load_rules(self, filepath):
         df = pd.read_csv(filepath, engine="python", on_bad_lines="skip", quoting=3)
+        self.rules = []
+        self._compiled = None
+        self._compiled_fis = None
         
         for idx in range(len(df)):
             row0, row1 = df.iloc[idx, 0], df.iloc[idx, 1]
@@ -95,7 +151,8 @@ class MamdaniFIS:
     
     def evaluate_rules(self, fuzzified):
         activations = []
-        for rule in self.rules:
+        fired = [] if self.rule_stats is not None else None
+        for index, rule in enumerate(self.rules):
             activation = 1.0
             for var, term in rule['antecedent'].items():
                 if var in fuzzified and term in fuzzified[var]:
@@ -105,6 +162,10 @@ class MamdaniFIS:
                     break
             if activation > 0:
                 activations.append({'activation': activation, 'consequent': rule['consequent']})
+                if fired is not None:
+                    fired.append(index)
+        if fired is not None:
+            self.rule_stats.observe(fired, [a['activation'] for a in activations], len(self.rules))
         return activations
     
     def aggregate(self, activations):
@@ -115,17 +176,8 @@ class MamdaniFIS:
         return aggregated
     
     def defuzzify_hybrid(self, aggregated):
-        if np.sum(aggregated) == 0:
-            return 5.0
-        results = []
-        for method in ['centroid', 'bisector', 'mom']:
-            try:
-                r = fuzz.defuzz(self.risk_universe, aggregated, method)
-                if not np.isnan(r):
-                    results.append(r)
-            except:
-                pass
-        return np.mean(results) if results else 5.0
+        """Centroid, bisector ve MOM ortalamasi; toplu cekirdekle tek satir olarak hesaplanir"""
+        return float(self._engine().defuzzify_hybrid_batch(np.asarray(aggregated, dtype=float)[None])[0])
     
     def infer(self, numeric_inputs):
         fuzzified = self.fuzzify_inputs(numeric_inputs)
@@ -138,6 +190,8 @@ class MamdaniFIS:
             elif score < 5: category = 'LowRisk'
             elif score < 7: category = 'MediumRisk'
             else: category = 'HighRisk'
+            if self.telemetry is not None:
+                self.telemetry.observe(numeric_inputs, score, category)
             return score, category, fuzzified, []
         
         aggregated = self.aggregate(activations)
@@ -148,19 +202,13 @@ class MamdaniFIS:
         elif score < 7: category = 'MediumRisk'
         else: category = 'HighRisk'
         
+        if self.telemetry is not None:
+            self.telemetry.observe(numeric_inputs, score, category)
         return score, category, fuzzified, activations
     
     def _calculate_risk_score(self, fuzzified):
         """Kural bulunamadiginda risk faktorlerine gore skor hesapla"""
-        risk_weights = {
-            'Age': {'Young': 0, 'Mid': 1, 'Old': 2, 'VeryOld': 3},
-            'BloodPressure': {'Medium': 0, 'High': 1.5, 'VeryHigh': 3},
-            'HbA1c': {'VeryHealthy': 0, 'Healthy': 1, 'High': 2.5},
-            'LDL': {'VeryHealthy': 0, 'Healthy': 0.5, 'High': 1.5, 'VeryHigh': 2, 'XHigh': 2.5},
-            'HDL': {'Healthy': 0, 'Low': 1.5},
-            'HeartRate': {'VeryHealthy': 0, 'Healthy': 0.5, 'High': 1.5},
-            'ChestPain': {'NoPain': 0, 'NonAnginal': 1, 'Atypical': 2, 'Typical': 3}
-        }
+        risk_weights = RISK_WEIGHTS
         
         total_score = 0
         for var, memberships in fuzzified.items():
@@ -170,38 +218,884 @@ class MamdaniFIS:
                     total_score += risk_weights[var][dominant]
         
         # 0-10 araligina normalize et
-        max_possible = 3 + 3 + 2.5 + 2.5 + 1.5 + 1.5 + 3  # 17
-        normalized = (total_score / max_possible) * 10
+        normalized = (total_score / MAX_RISK_SCORE) * 10
         return min(normalized, 10)
     
     def infer_categorical(self, categorical_inputs):
-        centers = {
-            'Age': {'Young': 35, 'Mid': 55, 'Old': 72, 'VeryOld': 90},
-            'HbA1c': {'VeryHealthy': 5.2, 'Healthy': 7.5, 'High': 10},
-            'LDL': {'VeryHealthy': 65, 'Healthy': 90, 'High': 125, 'VeryHigh': 165, 'XHigh': 210},
-            'HDL': {'Low': 32, 'Healthy': 60},
-            'HeartRate': {'VeryHealthy': 62, 'Healthy': 82, 'High': 130},
-            'BloodPressure': {'Medium': 100, 'High': 135, 'VeryHigh': 175},
-            'ChestPain': {'NoPain': 0, 'NonAnginal': 1, 'Atypical': 2, 'Typical': 3}
-        }
+        centers = CATEGORY_CENTERS
         numeric = {var: centers[var][term] for var, term in categorical_inputs.items() 
                    if var in centers and term in centers[var]}
         return self.infer(numeric)
+    
+    # --- Toplu (vektorel) cikarim ---
+    
+    def compile_rules(self):
+        """Kural tabanini toplu cikarim icin indeks dizilerine derler.
+        
+        Kurallar sonuc kumesine gore siralanir; her degisken icin kuralin
+        kullandigi terimin sutun indeksi tutulur. Kuralda gecmeyen degisken
+        'hep 1', tanimsiz degisken/terim 'hep 0' sutununa isaret eder.
+        """
+        if self._compiled is not None and self._compiled['key'] == self._rules_key():
+            return self._compiled
+        
+        var_names = list(self.variables)
+        term_lists = [list(self.variables[v].mfs) for v in var_names]
+        consequents = list(self.risk_mfs)
+        order = sorted(range(len(self.rules)),
+                       key=lambda r: consequents.index(self.rules[r]['consequent']))
+        
+        term_index = np.empty((len(var_names), len(order)), dtype=np.intp)
+        for j, r in enumerate(order):
+            antecedent = self.rules[r]['antecedent']
+            for i, terms in enumerate(term_lists):
+                term = antecedent.get(var_names[i])
+                if term is None:
+                    term_index[i, j] = len(terms)
+                elif term in terms:
+                    term_index[i, j] = terms.index(term)
+                else:
+                    term_index[i, j] = len(terms) + 1
+            if any(var not in self.variables for var in antecedent):
+                term_index[0, j] = len(term_lists[0]) + 1
+        
+        codes = np.array([consequents.index(self.rules[r]['consequent']) for r in order],
+                         dtype=np.intp)
+        self._compiled_fis = None
+        self._compiled = {
+            'key': self._rules_key(),
+            'n_rules': len(self.rules),
+            'rule_ids': np.array(order, dtype=np.intp),
+            'term_index': term_index,
+            'offsets': np.searchsorted(codes, np.arange(len(consequents) + 1)),
+            'risk_mfs': np.array([self.risk_mfs[c] for c in consequents]),
+            'fallback_weights': [np.array([RISK_WEIGHTS.get(v, {}).get(t, 0.0) for t in terms])
+                                 for v, terms in zip(var_names, term_lists)],
+        }
+        return self._compiled
+    
+    def compile(self):
+        """Is parcaciklari arasinda kilitsiz paylasilabilen `CompiledFIS` dondurur.
+        
+        Her cagri kurallarin ve `tsk_singletons`'in o anki halinden yeni bir
+        goruntu derler; onceden alinmis nesneler degismez. Toplu yontemlerin
+        onbellegi `rules` atandiginda, kural sayisi veya tekil degerler
+        degistiginde kendiliginden yenilenir; kural sozlukleri yerinde
+        duzenlendiyse `compile()` bu onbellegi de yeniler.
+        """
+        self._compiled = None
+        self._compiled_fis = None
+        return self._engine()
+    
+    def _engine(self):
+        """Toplu yontemlerin ortak `CompiledFIS`'i; kural tabani surumu veya tekil degerler degisince yenilenir"""
+        key = (self._rules_key(), tuple(self.tsk_singletons.items()))
+        if self._compiled_fis is None or self._engine_key != key:
+            self._compiled_fis = CompiledFIS(self)
+            self._engine_key = key
+        return self._compiled_fis
+    
+    def _batch_columns(self, columns):
+        return self._engine().batch_columns(columns)
+    
+    def fuzzify_batch(self, columns):
+        """Her degisken icin (N, terim+2) uyelik matrisi ve girdi var/yok maskesi dondurur"""
+        return self._engine().fuzzify_batch(columns)
+    
+    def evaluate_rules_batch(self, memberships):
+        """(N, kural) aktivasyon matrisi; sutunlar derlenmis kural sirasindadir"""
+        return self._engine().evaluate_rules_batch(memberships)
+    
+    def consequent_strengths(self, activations):
+        """Her sonuc kumesi icin en guclu kural aktivasyonu (MAX birlestirme)"""
+        return self._engine().consequent_strengths(activations)
+    
+    def aggregate_batch(self, strengths):
+        return self._engine().aggregate_batch(strengths)
+    
+    def defuzzify_hybrid_batch(self, aggregated):
+        """`defuzzify_hybrid` ile ayni centroid/bisector/mom hesaplarinin satir bazli hali"""
+        return self._engine().defuzzify_hybrid_batch(aggregated)
+    
+    def _fallback_scores_batch(self, memberships, present):
+        return self._engine()._fallback_scores_batch(memberships, present)
+    
+    def _infer_chunk(self, columns, rule_stats=None, repeats=None):
+        return self._engine()._infer_chunk(columns, rule_stats, repeats)
+    
+    def infer_batch(self, columns, chunk_size=1024, *, dedup=False, quantize=None, stats=None):
+        """Toplu Mamdani cikarimi; satir basina Python nesnesi olusturmaz.
+        
+        `columns` degisken adindan sayisal diziye bir eslemedir (dict, DataFrame...).
+        Eksik sutunlar ve NaN degerler `infer`'e verilmeyen girdi gibi ele alinir.
+        Skorlar ve RISK_CATEGORIES icindeki kategori indeksleri dondurulur.
+        
+        `dedup` ile yalnizca tekil satirlar skorlanip sonuclar ozgun siraya
+        dagitilir; `quantize` degisken basina yuvarlama adimidir (or. {'LDL': 1}).
+        `stats` sozlugu verilirse satir/tekil satir sayisi ve ayiklama orani yazilir.
+        Secenekler `CompiledFIS.infer_batch` ile karismamasi icin yalnizca adla verilir.
+        """
+        return self._run_batch(columns, chunk_size, self._infer_chunk, dedup, quantize, stats)
+    
+    def _run_batch(self, columns, chunk_size, infer_chunk, dedup=False, quantize=None, stats=None):
+        cols, n = self._batch_columns(columns)
+        rows, m, inverse = self._engine().reduce_rows(cols, n, dedup, quantize, stats)
+        scores = self._score_columns(rows, m, chunk_size, infer_chunk, self.rule_stats,
+                                     self._repeats(inverse, m))
+        if inverse is not None:
+            scores = scores[inverse]
+        codes = np.searchsorted(RISK_THRESHOLDS, scores, side='right').astype(np.int8)
+        
+        if self.telemetry is not None:
+            self.telemetry.observe_batch(cols, scores, codes)
+        return scores, codes
+    
+    @staticmethod
+    def _score_columns(cols, n, chunk_size, infer_chunk, rule_stats=None, repeats=None):
+        scores = np.empty(n)
+        for start in range(0, n, chunk_size):
+            chunk = {var: x[start:start + chunk_size] for var, x in cols.items()}
+            if rule_stats is None:
+                scores[start:start + chunk_size] = infer_chunk(chunk)
+            else:
+                part = None if repeats is None else repeats[start:start + chunk_size]
+                scores[start:start + chunk_size] = infer_chunk(chunk, rule_stats, part)
+        return scores
+    
+    def _repeats(self, inverse, m):
+        """Tekillestirilmis satirlarin ozgun satir sayilari (kural istatistikleri icin)"""
+        if inverse is None or self.rule_stats is None:
+            return None
+        return np.bincount(inverse, minlength=m)
+    
+    # --- Olcum belirsizligi (Monte Carlo) ---
+    
+    def infer_uncertain_batch(self, columns, noise_model, n_samples=1000,
+                              quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), seed=None,
+                              chunk_size=1024, max_rows=65536):
+        """Her hasta icin olcum hatasi orneklenerek skor dagilimi hesaplanir.
+        
+        `noise_model` degisken adindan ya mutlak standart sapmaya (Gauss hatasi,
+        degiskenin biriminde) ya da `f(rng, degerler, n_samples)` ile (hasta,
+        ornek) boyutunda bozulmus degerler ureten bir fonksiyona eslemedir.
+        Modelde olmayan degiskenler sabit kalir. Tum ornekler tek bir toplu
+        degerlendirmede skorlanir; bellek `max_rows` satirlik parcalarla sinirlanir.
+        
+        (hasta, kantil) skor kantilleri ve (hasta, kategori) olasiliklari dondurur.
+        """
+        if n_samples < 1:
+            raise ValueError(f"n_samples en az 1 olmali: {n_samples}")
+        rng = np.random.default_rng(seed)
+        cols, n = self._batch_columns(columns)
+        for var in noise_model:
+            if var not in self.variables:
+                raise KeyError(f"Bilinmeyen degisken: {var}")
+        
+        q = np.asarray(quantiles, dtype=float)
+        score_quantiles = np.empty((n, len(q)))
+        probabilities = np.empty((n, len(RISK_CATEGORIES)))
+        per_chunk = max(1, max_rows // n_samples)
+        
+        for start in range(0, n, per_chunk):
+            patients = {var: x[start:start + per_chunk] for var, x in cols.items()}
+            k = len(patients[next(iter(patients))])
+            samples = {}
+            for var, x in patients.items():
+                noise = noise_model.get(var)
+                if noise is None:
+                    samples[var] = np.repeat(x, n_samples)
+                elif callable(noise):
+                    values = np.asarray(noise(rng, x, n_samples), dtype=float)
+                    if values.shape != (k, n_samples):
+                        raise ValueError(f"'{var}' ornekleyicisi {values.shape} boyutunda deger "
+                                         f"dondurdu, beklenen {(k, n_samples)}")
+                    samples[var] = values.reshape(-1)
+                else:
+                    samples[var] = (x[:, None] + rng.normal(0.0, noise, (k, n_samples))).reshape(-1)
+            
+            scores = self._score_columns(samples, k * n_samples, chunk_size,
+                                         self._infer_chunk).reshape(k, n_samples)
+            codes = np.searchsorted(RISK_THRESHOLDS, scores, side='right')
+            score_quantiles[start:start + k] = np.quantile(scores, q, axis=1).T
+            for c in range(len(RISK_CATEGORIES)):
+                probabilities[start:start + k, c] = (codes == c).mean(axis=1)
+        
+        return score_quantiles, probabilities
+    
+    def infer_uncertain(self, patient, noise_model, n_samples=1000,
+                        quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), seed=None):
+        """Tek hasta icin `infer_uncertain_batch`; kantil ve kategori olasiligi sozlukleri dondurur"""
+        columns = {var: [patient.get(var, np.nan)] for var in self.variables}
+        score_quantiles, probabilities = self.infer_uncertain_batch(
+            columns, noise_model, n_samples, quantiles, seed)
+        return ({q: float(v) for q, v in zip(quantiles, score_quantiles[0])},
+                {c: float(p) for c, p in zip(RISK_CATEGORIES, probabilities[0])})
+    
+    # --- Yalnizca kategori: durulastirmadan erken cikis ---
+    
+    def score_bounds(self, strengths, max_depth=10, upper=None):
+        """Sonuc kumesi aktivasyonlarindan hibrit skor icin alt/ust sinir (`CompiledFIS.score_bounds`)"""
+        return self._engine().score_bounds(strengths, max_depth, upper)
+    
+    def classify(self, numeric_inputs):
+        """Yalnizca risk kategorisi; `infer(numeric_inputs)[1]` ile ayni sonucu verir.
+        
+        Skor sinirlari bir esik (3/5/7) uzerinde kalmadikca durulastirma yapilmaz.
+        Kurallar toplu motorla tek satir olarak degerlendirilir. Erken cikis
+        orani `classify_stats` sayaclarinda tutulur.
+        """
+        columns = {var: np.array([float(numeric_inputs.get(var, np.nan))]) for var in self.variables}
+        return RISK_CATEGORIES[self._classify_chunk(columns, self.rule_stats)[0]]
+    
+    def _classify_chunk(self, columns, rule_stats=None, repeats=None, counts=None):
+        codes, stats = self._engine()._classify_chunk(columns, rule_stats, repeats)
+        for key, value in stats.items():
+            self.classify_stats[key] += value
+            if counts is not None:
+                counts[key] += value
+        return codes
+    
+    def classify_batch(self, columns, chunk_size=1024, *, dedup=False, quantize=None, stats=None):
+        """`classify`'in toplu hali; RISK_CATEGORIES icindeki kategori indekslerini dondurur.
+        
+        `dedup` ve `quantize` `infer_batch` ile aynidir. `stats` sozlugune ayiklama
+        bilgisine ek olarak bu cagrinin `classify_stats` sayaclari yazilir.
+        """
+        cols, n = self._batch_columns(columns)
+        cols, n, inverse = self._engine().reduce_rows(cols, n, dedup, quantize, stats)
+        repeats = self._repeats(inverse, n)
+        counts = dict.fromkeys(self.classify_stats, 0)
+        codes = np.empty(n, dtype=np.int8)
+        for start in range(0, n, chunk_size):
+            chunk = {var: x[start:start + chunk_size] for var, x in cols.items()}
+            part = None if repeats is None else repeats[start:start + chunk_size]
+            codes[start:start + chunk_size] = self._classify_chunk(chunk, self.rule_stats, part, counts)
+        if stats is not None:
+            stats.update(counts)
+        return codes if inverse is None else codes[inverse]
+    
+    # --- Sifirinci derece Sugeno (TSK) modu ---
+    
+    def infer_tsk(self, numeric_inputs):
+        """TSK cikarimi: skor, kural aktivasyonlarinin sonuc tekil degerleriyle agirlikli ortalamasidir.
+        
+        Ayni degiskenler ve kural tabani kullanilir; birlestirme ve durulastirma adimlari yoktur.
+        Skor toplu cekirdekle tek satir olarak hesaplanir; toplama sirasi ayni oldugu
+        icin esik uzerindeki skorlar `infer_tsk_batch` ile ayni kategoriye duser.
+        """
+        fuzzified = self.fuzzify_inputs(numeric_inputs)
+        activations = self.evaluate_rules(fuzzified)
+        columns = {var: np.array([float(numeric_inputs.get(var, np.nan))]) for var in self.variables}
+        score = float(self._infer_tsk_chunk(columns)[0])
+        
+        if score < 3: category = 'Healthy'
+        elif score < 5: category = 'LowRisk'
+        elif score < 7: category = 'MediumRisk'
+        else: category = 'HighRisk'
+        
+        if self.telemetry is not None:
+            self.telemetry.observe(numeric_inputs, score, category)
+        return score, category, fuzzified, activations
+    
+    def _infer_tsk_chunk(self, columns, rule_stats=None, repeats=None):
+        return self._engine()._infer_tsk_chunk(columns, rule_stats, repeats)
+    
+    def infer_tsk_batch(self, columns, chunk_size=1024, *, dedup=False, quantize=None, stats=None):
+        """`infer_tsk`'nin toplu hali; `infer_batch` ile ayni girdi/cikti bicimi"""
+        return self._run_batch(columns, chunk_size, self._infer_tsk_chunk, dedup, quantize, stats)
 
 
-def evaluate():
-    print("=" * 60)
-    print("Kalp Hastaligi Risk Tahmin Sistemi")
-    print("Mamdani FIS + Hibrit Durulaştirma")
-    print("=" * 60)
+def _readonly(values):
+    """Salt okunur kopya; derlenmis modelin dizileri yerinde degistirilemez"""
+    array = np.array(values)
+    array.setflags(write=False)
+    return array
+
+
+def _trapezoid_weights(x):
+    """Yamuk alan ve moment agirliklari: alan = w @ mf, moment = v @ mf.
     
-    fis = MamdaniFIS()
-    print(f"\nKural sayisi: {fis.load_rules(RULES_FILE)}")
+    skfuzzy centroid'in parca formulleriyle aynidir (esit olmayan adimlar dahil).
+    """
+    dx = np.diff(x)
+    w = np.zeros(len(x))
+    w[:-1] += 0.5 * dx
+    w[1:] += 0.5 * dx
+    v = np.zeros(len(x))
+    v[:-1] += dx * dx / 6 + 0.5 * x[:-1] * dx
+    v[1:] += dx * dx / 3 + 0.5 * x[:-1] * dx
+    return w, v
+
+
+class CompiledFIS:
+    """`MamdaniFIS`'in degistirilemez, derlenmis hali (`MamdaniFIS.compile()`).
+    
+    Degisken evrenleri, MF'ler, kural indeksleri ve sinir tablolari salt okunur
+    dizilere kopyalanir; cikarim sirasinda hicbir durum (istatistik, onbellek,
+    telemetri) guncellenmez. Bu nedenle tek bir nesne kilitsiz olarak birden cok
+    is parcaciginda kullanilabilir. Toplu cekirdeklerin zamani buyuk olcude GIL'i
+    birakan NumPy islemlerinde gecer; `executor` verildiginde parcalar bir
+    is parcacigi havuzunda paralel skorlanir.
+    """
+    
+    def __init__(self, fis):
+        compiled = fis.compile_rules()
+        self.variable_names = tuple(fis.variables)
+        self.universes = tuple(_readonly(var.universe) for var in fis.variables.values())
+        self.mfs = tuple(_readonly(list(var.mfs.values())) for var in fis.variables.values())
+        self.n_rules = compiled['n_rules']
+        self.rule_ids = _readonly(compiled['rule_ids'])
+        self.term_index = _readonly(compiled['term_index'])
+        self.offsets = _readonly(compiled['offsets'])
+        self.risk_universe = _readonly(fis.risk_universe)
+        self.risk_mfs = _readonly(compiled['risk_mfs'])
+        self.fallback_weights = tuple(_readonly(w) for w in compiled['fallback_weights'])
+        self.tsk_singletons = _readonly([float(fis.tsk_singletons[c]) for c in fis.risk_mfs])
+        self.bound_tables = self._build_bound_tables(self.risk_universe, self.risk_mfs)
+        self._sealed = True
+    
+    def __setattr__(self, name, value):
+        if getattr(self, '_sealed', False):
+            raise AttributeError("CompiledFIS degistirilemez; yeni model icin MamdaniFIS.compile()")
+        object.__setattr__(self, name, value)
+    
+    def batch_columns(self, columns):
+        """Girdileri degisken sirasinda float sutunlara cevirir; eksik sutunlar NaN olur"""
+        cols, n = {}, None
+        for var in self.variable_names:
+            if var in columns:
+                cols[var] = np.asarray(columns[var], dtype=float).ravel()
+                if n is None:
+                    n = len(cols[var])
+                elif len(cols[var]) != n:
+                    raise ValueError(f"'{var}' sutun uzunlugu diger sutunlarla ayni degil")
+        if n is None:
+            raise ValueError("Girdilerde tanimli degisken bulunamadi")
+        for var in self.variable_names:
+            if var not in cols:
+                cols[var] = np.full(n, np.nan)
+        return cols, n
     
-    df = pd.read_csv(TEST_FILE, engine="python", on_bad_lines="skip", quoting=3)
-    print(f"Test verisi: {len(df)}")
+    def fuzzify_batch(self, columns):
+        """Her degisken icin (N, terim+2) uyelik matrisi ve girdi var/yok maskesi dondurur"""
+        memberships, present = [], []
+        for var_name, universe, mfs in zip(self.variable_names, self.universes, self.mfs):
+            x = columns[var_name]
+            missing = np.isnan(x)
+            m = np.empty((len(x), len(mfs) + 2))
+            for t, mf in enumerate(mfs):
+                m[:, t] = np.interp(x, universe, mf, left=0.0, right=0.0)
+            m[missing, :-2] = 0.0
+            m[:, -2] = 1.0
+            m[:, -1] = 0.0
+            memberships.append(m)
+            present.append(~missing)
+        return memberships, present
     
-    y_true, y_pred = [], []
+    def evaluate_rules_batch(self, memberships):
+        """(N, kural) aktivasyon matrisi; sutunlar derlenmis kural sirasindadir"""
+        term_index = self.term_index
+        activations = np.take(memberships[0], term_index[0], axis=1)
+        buffer = np.empty_like(activations)
+        for m, idx in zip(memberships[1:], term_index[1:]):
+            np.take(m, idx, axis=1, out=buffer)
+            np.minimum(activations, buffer, out=activations)
+        return activations
+    
+    def consequent_strengths(self, activations):
+        """Her sonuc kumesi icin en guclu kural aktivasyonu (MAX birlestirme)"""
+        offsets = self.offsets
+        strengths = np.zeros((activations.shape[0], len(offsets) - 1))
+        for c in range(len(offsets) - 1):
+            if offsets[c + 1] > offsets[c]:
+                strengths[:, c] = activations[:, offsets[c]:offsets[c + 1]].max(axis=1)
+        return strengths
+    
+    def aggregate_batch(self, strengths):
+        risk_mfs = self.risk_mfs
+        aggregated = np.minimum(strengths[:, :1], risk_mfs[0])
+        for c in range(1, len(risk_mfs)):
+            np.maximum(aggregated, np.minimum(strengths[:, c:c + 1], risk_mfs[c]), out=aggregated)
+        return aggregated
+    
+    def defuzzify_hybrid_batch(self, aggregated):
+        """Satir bazli centroid/bisector/mom ortalamasi (skfuzzy'nin parca formulleri).
+        
+        skfuzzy'den farkli olarak kumulatif alan sifir parcalardan sonra da
+        korunur ve bisector, alanin yarisinin gecildigi parcanin icine kirpilir
+        (yuvarlamayla NaN veya parca disi deger olusmaz). Centroid eps ile
+        kirpilmaz; boylece skor her zaman evren icindedir.
+        """
+        x = self.risk_universe
+        x1, x2 = x[:-1], x[1:]
+        dx = x2 - x1
+        y1, y2 = aggregated[:, :-1], aggregated[:, 1:]
+        ysum = y1 + y2
+        area = 0.5 * dx * ysum
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Centroid: parcali dogrusal alanlarin moment ortalamasi
+            moment = np.where(y1 == y2, 0.5 * (x1 + x2),
+                     np.where(y1 == 0, 2.0 / 3.0 * dx + x1,
+                     np.where(y2 == 0, 1.0 / 3.0 * dx + x1,
+                              (2.0 / 3.0 * dx * (y2 + 0.5 * y1)) / ysum + x1)))
+            accum = np.cumsum(area, axis=1)
+            sum_area = accum[:, -1]
+            sum_moment = np.cumsum(moment * area, axis=1)[:, -1]
+            centroid = sum_moment / sum_area
+            
+            # Bisector: alani ikiye bolen noktanin bulundugu parca
+            half = sum_area / 2.
+            index = np.argmax(accum >= half[:, None], axis=1)
+            rows = np.arange(len(aggregated))
+            sub = half - np.where(index > 0, accum[rows, index - 1], 0.0)
+            xa, xb = x1[index], x2[index]
+            ya, yb = y1[rows, index], y2[rows, index]
+            d = xb - xa
+            slope = (yb - ya) / d
+            bisector = np.where(ya == yb, sub / ya + xa,
+                       np.where(ya == 0, xa + np.sqrt(2. * sub * d / yb),
+                       np.where(yb == 0, xb - np.sqrt(np.maximum(d * d - (2. * sub * d / ya), 0.0)),
+                                xa - (ya - np.sqrt(np.maximum(ya * ya + 2.0 * slope * sub, 0.0))) / slope)))
+            bisector = np.clip(bisector, xa, xb)
+        
+        # MOM: en yuksek uyeligin ortalama konumu
+        peak = aggregated == aggregated.max(axis=1, keepdims=True)
+        mom = (peak * x).sum(axis=1) / peak.sum(axis=1)
+        
+        # Alani alt tasmaya ugrayan kumede NaN veren yontem ortalamaya girmez
+        parts = np.stack([centroid, bisector, mom])
+        valid = ~np.isnan(parts)
+        count = valid.sum(axis=0)
+        scores = np.where(valid, parts, 0.0).sum(axis=0) / np.maximum(count, 1)
+        scores[(count == 0) | (aggregated.sum(axis=1) == 0)] = 5.0
+        return scores
+    
+    def _fallback_scores_batch(self, memberships, present):
+        weights = self.fallback_weights
+        total_score = np.zeros(len(present[0]))
+        for m, p, w in zip(memberships, present, weights):
+            total_score += np.where(p, w[np.argmax(m[:, :-2], axis=1)], 0.0)
+        return np.minimum((total_score / MAX_RISK_SCORE) * 10, 10)
+    
+    def _activations(self, memberships, rule_stats, repeats):
+        activations = self.evaluate_rules_batch(memberships)
+        if rule_stats is not None:
+            rule_stats.observe_batch(activations, self.rule_ids, repeats)
+        return activations
+    
+    def _infer_chunk(self, columns, rule_stats=None, repeats=None):
+        memberships, present = self.fuzzify_batch(columns)
+        strengths = self.consequent_strengths(self._activations(memberships, rule_stats, repeats))
+        fired = strengths.max(axis=1) > 0
+        scores = self._fallback_scores_batch(memberships, present)
+        if fired.any():
+            scores[fired] = self.defuzzify_hybrid_batch(self.aggregate_batch(strengths[fired]))
+        return scores
+    
+    def _infer_tsk_chunk(self, columns, rule_stats=None, repeats=None):
+        memberships, present = self.fuzzify_batch(columns)
+        activations = self._activations(memberships, rule_stats, repeats)
+        # Satir bazli toplamlar parca boyutundan bagimsizdir (BLAS matris-vektor
+        # carpimi satir sayisina gore farkli sirada toplar, esikte kategori degisir)
+        offsets = self.offsets
+        sums = np.zeros((len(activations), len(offsets) - 1))
+        for c in range(len(offsets) - 1):
+            if offsets[c + 1] > offsets[c]:
+                sums[:, c] = activations[:, offsets[c]:offsets[c + 1]].sum(axis=1)
+        weights = sums.sum(axis=1)
+        fired = weights > 0
+        scores = self._fallback_scores_batch(memberships, present)
+        scores[fired] = (sums[fired] * self.tsk_singletons).sum(axis=1) / weights[fired]
+        return scores
+    
+    @staticmethod
+    def _build_bound_tables(x, mfs):
+        """Kirpilmis cikis MF'leri icin onek toplam tablolari.
+        
+        min(t, mf) orneklenmis evren uzerinde t'ye gore parcali dogrusaldir ve
+        mf > t olan noktalar tek bir indeks araligidir. Boylece alan, moment ve
+        kumulatif alan birkac onek toplami ile kapali bicimde hesaplanir.
+        Komsu olmayan kumeler ortusurse veya MF tek tepeli degilse None doner.
+        """
+        dx = np.diff(x)
+        mfs = list(mfs)
+        positive = [mf > 0 for mf in mfs]
+        usable = not any((positive[c] & positive[d]).any()
+                         for c in range(len(mfs)) for d in range(c + 2, len(mfs)))
+        w, v = _trapezoid_weights(x)
+        
+        def prefix(a):
+            return _readonly(np.concatenate(([0.0], np.cumsum(a))))
+        
+        # Kumeler (+) ve komsu cift kesisimleri (-): max(a, b) = a + b - min(a, b)
+        funcs = mfs + [np.minimum(mfs[c], mfs[c + 1]) for c in range(len(mfs) - 1)]
+        tables = []
+        for m in funcs:
+            p = int(np.argmax(m))
+            rising, falling = m[:p + 1], m[p:]
+            if (np.diff(rising) < 0).any() or (np.diff(falling) > 0).any():
+                usable = False
+            tables.append(MappingProxyType({
+                'm': _readonly(m), 'p': p, 'peak': float(m[p]), 'rising': _readonly(rising),
+                'falling_rev': _readonly(falling[::-1]), 'W': prefix(w), 'WM': prefix(w * m),
+                'VM': prefix(v * m), 'V': prefix(v), 'X': prefix(x)}))
+        
+        if not usable:
+            return None
+        # Nokta agirliklarinin konumu (v / w); centroid esigi aramasinda kullanilir
+        position = _readonly(np.append(v / w, np.inf))
+        return MappingProxyType({'tables': tuple(tables), 'dx': _readonly(dx), 'position': position})
+    
+    @staticmethod
+    def _plateau(tab, t, side='right'):
+        """mf > t (side='right') veya mf >= t (side='left') olan [i1, i2) indeks araligi"""
+        i1 = np.searchsorted(tab['rising'], t, side=side)
+        i2 = tab['p'] + len(tab['falling_rev']) - np.searchsorted(tab['falling_rev'], t, side=side)
+        return np.minimum(i1, i2), i2
+    
+    @staticmethod
+    def _clipped_sum(tab, coef, t, i1, i2, k):
+        """sum_{j<k} coef_j * min(t, m_j)"""
+        a, b = np.minimum(i1, k), np.minimum(i2, k)
+        pm, p = tab[coef + 'M'], tab[coef]
+        return pm[k] - (pm[b] - pm[a]) + t * (p[b] - p[a])
+    
+    def _terms(self, t):
+        """Kirpma seviyeleri t (N, kume) icin onek tablosu terimleri: (isaret, tablo, seviye, plato)"""
+        tables = self.bound_tables['tables']
+        n_sets = t.shape[1]
+        levels = [t[:, c] for c in range(n_sets)]
+        levels += [np.minimum(t[:, c], t[:, c + 1]) for c in range(n_sets - 1)]
+        signs = [1.0] * n_sets + [-1.0] * (n_sets - 1)
+        return [(s, tab, level, self._plateau(tab, level)) for s, tab, level in zip(signs, tables, levels)]
+    
+    def _prefix(self, terms, coef, k):
+        """Birlesik kume a icin sum_{j<k} coef_j * a_j ('W': alan, 'V': moment agirliklari)"""
+        return sum(s * self._clipped_sum(tab, coef, t, i1, i2, k) for s, tab, t, (i1, i2) in terms)
+    
+    def _value(self, terms, j):
+        """Birlesik kumenin j noktasindaki degeri"""
+        return sum(s * np.minimum(t, tab['m'][j]) for s, tab, t, _ in terms)
+    
+    def _area_to(self, terms, k):
+        """Birlesik kumenin x_0 ile x_k arasindaki alani"""
+        dx = self.bound_tables['dx']
+        prev = np.maximum(k, 1) - 1
+        area = self._prefix(terms, 'W', k) + 0.5 * dx[prev] * self._value(terms, k)
+        return np.where(k > 0, area, 0.0)
+    
+    @staticmethod
+    def _first_true(predicate, lo, hi, max_steps=64):
+        """Once yanlis sonra dogru olan yuklemin [lo, hi] icindeki ilk dogru indeksi.
+        
+        predicate(hi) dogru kabul edilir. `max_steps` adimda kapanmayan
+        satirlarda yuklem lo'dan oncesi icin yanlis, hi icin dogrudur.
+        """
+        for _ in range(max_steps):
+            open_ = lo < hi
+            if not open_.any():
+                break
+            mid = (lo + hi) // 2
+            hit = predicate(np.where(open_, mid, hi))
+            hi = np.where(open_ & hit, mid, hi)
+            lo = np.where(open_ & ~hit, mid + 1, lo)
+        return lo, hi
+    
+    @staticmethod
+    def _segment_offset(sub, ya, yb, d):
+        """Uc yukseklikleri ya, yb olan yamuk parcada alanin `sub`'a ulastigi uzaklik.
+        
+        Sonuc sub ile artar, ya ve yb ile azalir; parca genisligine kirpilir.
+        """
+        sub = np.maximum(sub, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            root = np.sqrt(np.maximum(ya * ya + 2.0 * (yb - ya) / d * sub, 0.0))
+            t = np.minimum(2.0 * sub / (ya + root), d)
+        return np.where(sub >= 0.5 * d * (ya + yb), d, np.where(sub > 0, t, 0.0))
+    
+    def score_bounds(self, strengths, max_depth=10, upper=None):
+        """Sonuc kumesi aktivasyonlarindan hibrit skor icin alt/ust sinir.
+        
+        `upper` verilirse her aktivasyon strengths ile upper arasinda bir
+        aralik kabul edilir (girdi kutulari, bkz. score_range.py); birlesik kume
+        iki uc aktivasyonun kumeleri arasinda kalir. Centroid, MOM ve
+        kumulatif alan onek toplamlariyla kapali bicimde hesaplanir:
+        centroid'in uc degeri esik yapili bir egride olusur (Karnik-Mendel),
+        bisector alanin yarisinin gecilebilecegi parcalar icinde sinirlanir
+        (arama `max_depth` adimla sinirlidir). Aralik sorgusunda tepe
+        yuksekligine bolunmus kume icin ikinci bir zarf kurulur; aktivasyonlar
+        sifira yakinken de sinir daralir. Hesaplanamayan satirlar (cok kucuk
+        alan) icin evrenin uclari doner.
+        """
+        n = len(strengths)
+        x = self.risk_universe
+        low, high = np.full(n, x[0]), np.full(n, x[-1])
+        tabs = self.bound_tables
+        if tabs is None or n == 0:
+            return low, high
+        tables, dx = tabs['tables'], tabs['dx']
+        n_sets = strengths.shape[1]
+        full = len(x)
+        point = upper is None
+        s_lo, s_hi = strengths, strengths if point else upper
+        
+        peaks = np.array([tab['peak'] for tab in tables[:n_sets]])
+        h_lo, h_hi = np.minimum(s_lo, peaks), np.minimum(s_hi, peaks)
+        level, top = h_lo.max(axis=1), h_hi.max(axis=1)
+        candidate = (h_hi >= level[:, None]) & (h_hi > 0)
+        
+        # Zarflar: (alt seviyeler, alt carpan, ust seviyeler, ust carpan)
+        terms_lo = self._terms(s_lo)
+        terms_hi = terms_lo if point else self._terms(s_hi)
+        envelopes = [(terms_lo, 1.0, terms_hi, 1.0)]
+        if not point:
+            # a/H zarfi: tepeyi veren kume tekse en az min(H, mf) kadardir, diger
+            # kumeler H'nin ustune cikamaz. Kucuk H'de onek farklari hassasiyetini yitirir.
+            scaled = level > 1e-4
+            single = scaled & (candidate.sum(axis=1) == 1)
+            t_lo = np.where(single[:, None] & candidate, np.maximum(s_lo, top[:, None]), s_lo)
+            t_hi = np.where(scaled[:, None], np.minimum(s_hi, level[:, None]), s_hi)
+            envelopes.append((self._terms(t_lo), 1.0 / np.where(scaled, top, 1.0),
+                              self._terms(t_hi), 1.0 / np.where(scaled, level, 1.0)))
+        
+        area_hi = self._prefix(terms_hi, 'W', full)
+        ok = area_hi > 1e-12
+        
+        c_lo, c_hi = np.full(n, -np.inf), np.full(n, np.inf)
+        b_lo, b_hi = np.full(n, -np.inf), np.full(n, np.inf)
+        for e_lo, f_lo, e_hi, f_hi in envelopes:
+            w_lo, v_lo = f_lo * self._prefix(e_lo, 'W', full), f_lo * self._prefix(e_lo, 'V', full)
+            w_hi, v_hi = f_hi * self._prefix(e_hi, 'W', full), f_hi * self._prefix(e_hi, 'V', full)
+            
+            # Centroid
+            if point:
+                centroid = v_lo / np.where(ok, w_lo, 1.0)
+                c_lo, c_hi = centroid, centroid
+            else:
+                def ratio(k, left, f_left, right, f_right, v_right, w_right, empty):
+                    num = f_left * self._prefix(left, 'V', k) + v_right - f_right * self._prefix(right, 'V', k)
+                    den = f_left * self._prefix(left, 'W', k) + w_right - f_right * self._prefix(right, 'W', k)
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        return np.where(den > 0, num / den, empty)
+                
+                # Solda ust, sagda alt zarf en kucuk centroid'i verir (tersi en buyugu);
+                # en iyi esik, noktanin konumunun oranin ustune ciktigi ilk indekstir.
+                position = tabs['position']
+                for sign, left, f_left, right, f_right, v_right, w_right in (
+                        (-1, e_hi, f_hi, e_lo, f_lo, v_lo, w_lo), (1, e_lo, f_lo, e_hi, f_hi, v_hi, w_hi)):
+                    empty = -sign * np.inf
+                    args = (left, f_left, right, f_right, v_right, w_right, empty)
+                    k, _ = self._first_true(lambda k: position[k] >= ratio(k, *args),
+                                            np.zeros(n, dtype=np.intp), np.full(n, full, dtype=np.intp))
+                    best = ratio(k, *args)
+                    other = ratio(np.maximum(k - 1, 0), *args)
+                    if sign < 0:
+                        c_lo = np.maximum(c_lo, np.fmin(best, other))
+                    else:
+                        c_hi = np.minimum(c_hi, np.fmax(best, other))
+            
+            # Bisector: x_0..x_k alaninin sag taraftan buyuk olup olamayacagi k'da monotondur
+            def spread(k, left, f_left, right, f_right, total):
+                return f_left * self._area_to(left, k) - (total - f_right * self._area_to(right, k))
+            
+            tol = 1e-9 * w_hi
+            k1, _ = self._first_true(lambda k: spread(k, e_hi, f_hi, e_lo, f_lo, w_lo) >= -tol,
+                                     np.zeros(n, dtype=np.intp), np.full(n, full - 1, dtype=np.intp),
+                                     max_depth)
+            _, k2 = self._first_true(lambda k: spread(k, e_lo, f_lo, e_hi, f_hi, w_hi) > tol,
+                                     k1, np.full(n, full - 1, dtype=np.intp), max_depth)
+            
+            # Kesisen parca icinde: yari alana kalan pay ve parca uc yukseklikleri sinirlanir.
+            # Pay, toplamlarin yuvarlama hatasi kadar genisletilir; alcak parcalarda konumu buyutur.
+            a = np.maximum(k1 - 1, 0)
+            sub = w_lo / 2 - f_hi * self._area_to(e_hi, a) - tol
+            offset = self._segment_offset(sub, f_hi * self._value(e_hi, a), f_hi * self._value(e_hi, a + 1), dx[a])
+            b_lo = np.maximum(b_lo, np.where(k1 > 0, x[a] + offset, x[0]))
+            b = np.maximum(k2 - 1, 0)
+            sub = w_hi / 2 - f_lo * self._area_to(e_lo, b) + tol
+            offset = self._segment_offset(sub, f_lo * self._value(e_lo, b), f_lo * self._value(e_lo, b + 1), dx[b])
+            b_hi = np.minimum(b_hi, np.where(k2 > 0, x[b] + offset, x[0]))
+        
+        # MOM: tepe seviyesi ve ona ulasan kumeler kesinse platolarin birlesimi tam hesaplanir
+        X = tables[0]['X']
+        exact = (level == top) & ((h_lo == h_hi) | ~candidate).all(axis=1)
+        sum_x, count = np.zeros(n), np.zeros(n)
+        prev_end = np.zeros(n, dtype=np.intp)
+        for c in range(n_sets):
+            tied = candidate[:, c]
+            j1, j2 = self._plateau(tables[c], top, side='left')
+            j1, j2 = np.where(tied, j1, 0), np.where(tied, j2, 0)
+            overlap_end = np.minimum(prev_end, j2)
+            j1 = np.where(tied, np.maximum(j1, np.minimum(overlap_end, j2)), 0)
+            sum_x += X[j2] - X[j1]
+            count += j2 - j1
+            prev_end = np.where(tied, j2, prev_end)
+        m_lo = m_hi = sum_x / np.maximum(count, 1)
+        if not exact.all():
+            # Tepeyi veren her aday kume icin H, alt seviye ile kumenin ust siniri arasindadir;
+            # platosu [mf >= H] bu iki seviyedeki platolar arasinda kalir. Birlesimin ortalamasi
+            # kume ortalamalarinin arasindadir.
+            def mean(i1, i2):
+                return (X[i2] - X[i1]) / np.maximum(i2 - i1, 1)
+            
+            loose_lo, loose_hi = np.full(n, np.inf), np.full(n, -np.inf)
+            for c in range(n_sets):
+                wide1, wide2 = self._plateau(tables[c], level, side='left')
+                support1, support2 = self._plateau(tables[c], np.zeros(n))
+                wide1 = np.where(level > 0, wide1, support1)
+                wide2 = np.where(level > 0, wide2, support2)
+                narrow1, narrow2 = self._plateau(tables[c], h_hi[:, c], side='left')
+                loose_lo = np.where(candidate[:, c], np.minimum(loose_lo, mean(wide1, narrow2)), loose_lo)
+                loose_hi = np.where(candidate[:, c], np.maximum(loose_hi, mean(narrow1, wide2)), loose_hi)
+            m_lo, m_hi = np.where(exact, m_lo, loose_lo), np.where(exact, m_hi, loose_hi)
+        
+        # Skor her zaman evren icindedir
+        margin = 1e-9
+        low = np.where(ok, np.maximum((c_lo + b_lo + m_lo) / 3 - margin, x[0]), x[0])
+        high = np.where(ok, np.minimum((c_hi + b_hi + m_hi) / 3 + margin, x[-1]), x[-1])
+        return low, high
+    
+    def _classify_strengths(self, strengths):
+        """Sinirlarla karar verilebilen satirlarin kategori indeksleri; digerleri -1"""
+        lower, upper = self.score_bounds(strengths)
+        low_code = np.searchsorted(RISK_THRESHOLDS, lower, side='right')
+        high_code = np.searchsorted(RISK_THRESHOLDS, upper, side='right')
+        return np.where(low_code == high_code, low_code, -1).astype(np.int8)
+    
+    def _classify_chunk(self, columns, rule_stats=None, repeats=None):
+        memberships, present = self.fuzzify_batch(columns)
+        strengths = self.consequent_strengths(self._activations(memberships, rule_stats, repeats))
+        fired = strengths.max(axis=1) > 0
+        scores = self._fallback_scores_batch(memberships, present)
+        codes = np.searchsorted(RISK_THRESHOLDS, scores, side='right').astype(np.int8)
+        stats = {'calls': len(codes), 'no_rule': 0, 'early_exit': 0, 'full': 0}
+        
+        if fired.any():
+            fired_codes = self._classify_strengths(strengths[fired])
+            undecided = fired_codes < 0
+            if undecided.any():
+                full = self.defuzzify_hybrid_batch(self.aggregate_batch(strengths[fired][undecided]))
+                fired_codes[undecided] = np.searchsorted(RISK_THRESHOLDS, full, side='right')
+            codes[fired] = fired_codes
+            stats['early_exit'] = int((~undecided).sum())
+            stats['full'] = int(undecided.sum())
+        stats['no_rule'] = int((~fired).sum())
+        return codes, stats
+    
+    def reduce_rows(self, cols, n, dedup=False, quantize=None, stats=None):
+        """Girdileri nicemler ve istenirse yinelenen satirlari ayiklar.
+        
+        `quantize` degisken adindan yuvarlama adimina (pozitif, sonlu) eslemedir;
+        deger en yakin adim katina yuvarlanir (NaN korunur). Satirlar bayt
+        karsilastirmasiyla tekillestirilir, dolayisiyla ayni degerli eksik
+        girdiler de birlesir.
+        (skorlanacak sutunlar, satir sayisi, geri dagitma indeksi veya None)
+        dondurur. `stats` verilirse 'rows', 'unique_rows' ve 'dedup_ratio'
+        (satir / tekil satir) yazilir.
+        """
+        if quantize:
+            cols = dict(cols)
+            for var, step in quantize.items():
+                if var not in cols:
+                    raise KeyError(f"Bilinmeyen degisken: {var}")
+                if not np.isfinite(step) or step <= 0:
+                    raise ValueError(f"'{var}' icin yuvarlama adimi pozitif ve sonlu olmali: {step}")
+                cols[var] = np.round(cols[var] / step) * step
+        
+        inverse, unique = None, n
+        if dedup and n:
+            # -0.0 ile 0.0 ayni bayt dizisine cevrilir (+ 0.0)
+            matrix = np.column_stack([cols[var] for var in self.variable_names]) + 0.0
+            keys = matrix.view(np.dtype((np.void, matrix.itemsize * matrix.shape[1]))).ravel()
+            _, index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            cols = {var: x[index] for var, x in cols.items()}
+            unique = len(index)
+        
+        if stats is not None:
+            stats.update(rows=n, unique_rows=unique, dedup_ratio=n / unique if unique else 1.0)
+        return cols, unique, inverse
+    
+    def _map_chunks(self, columns, chunk_size, chunk_fn, executor, dedup, quantize, stats,
+                    rule_stats):
+        cols, n = self.batch_columns(columns)
+        cols, m, inverse = self.reduce_rows(cols, n, dedup, quantize, stats)
+        repeats = None
+        if inverse is not None and rule_stats is not None:
+            repeats = np.bincount(inverse, minlength=m)
+        
+        def run(start):
+            chunk = {var: x[start:start + chunk_size] for var, x in cols.items()}
+            part = None if repeats is None else repeats[start:start + chunk_size]
+            return chunk_fn(chunk, rule_stats, part)
+        
+        starts = range(0, m, chunk_size)
+        if executor is None:
+            return m, inverse, [run(start) for start in starts]
+        return m, inverse, list(executor.map(run, starts))
+    
+    def _scores(self, columns, chunk_size, chunk_fn, executor, dedup, quantize, stats, rule_stats):
+        m, inverse, parts = self._map_chunks(columns, chunk_size, chunk_fn, executor,
+                                             dedup, quantize, stats, rule_stats)
+        scores = np.concatenate(parts) if parts else np.empty(m)
+        if inverse is not None:
+            scores = scores[inverse]
+        codes = np.searchsorted(RISK_THRESHOLDS, scores, side='right').astype(np.int8)
+        return scores, codes
+    
+    def infer_batch(self, columns, chunk_size=1024, *, executor=None, dedup=False, quantize=None,
+                    stats=None, rule_stats=None):
+        """`MamdaniFIS.infer_batch` ile ayni skorlar ve kategori indeksleri.
+        
+        `executor` (or. `concurrent.futures.ThreadPoolExecutor`) verilirse
+        `chunk_size` satirlik parcalar havuzda eszamanli skorlanir. `dedup`,
+        `quantize` ve `stats` icin `reduce_rows`. Model durum tutmadigi icin
+        kural atesleme istatistikleri cagri basina `rule_stats` ile toplanir.
+        Secenekler yalnizca adla verilir.
+        """
+        return self._scores(columns, chunk_size, self._infer_chunk, executor, dedup, quantize,
+                            stats, rule_stats)
+    
+    def infer_tsk_batch(self, columns, chunk_size=1024, *, executor=None, dedup=False, quantize=None,
+                        stats=None, rule_stats=None):
+        """`MamdaniFIS.infer_tsk_batch` karsiligi; tekil degerler derleme anindaki degerlerdir"""
+        return self._scores(columns, chunk_size, self._infer_tsk_chunk, executor,
+                            dedup, quantize, stats, rule_stats)
+    
+    def classify_batch(self, columns, chunk_size=1024, *, executor=None, dedup=False, quantize=None,
+                       stats=None, rule_stats=None):
+        """`MamdaniFIS.classify_batch` ile ayni kategori indeksleri.
+        
+        Model durum tutmadigi icin bu cagriya ait `classify_stats` sayaclari
+        (`dedup` ile tekil satirlar sayilir) ayiklama bilgisiyle `stats` sozlugune yazilir.
+        """
+        m, inverse, parts = self._map_chunks(columns, chunk_size, self._classify_chunk, executor,
+                                             dedup, quantize, stats, rule_stats)
+        codes = np.concatenate([p[0] for p in parts]) if parts else np.empty(m, dtype=np.int8)
+        if stats is not None:
+            counts = {'calls': 0, 'no_rule': 0, 'early_exit': 0, 'full': 0}
+            for _, part in parts:
+                for key, value in part.items():
+                    counts[key] += value
+            stats.update(counts)
+        return codes if inverse is None else codes[inverse]
+    
+    def infer(self, numeric_inputs):
+        """Tek hasta icin (skor, kategori); `MamdaniFIS.infer` ile ayni sonuc"""
+        columns = {var: [numeric_inputs.get(var, np.nan)] for var in self.variable_names}
+        scores, codes = self.infer_batch(columns)
+        return float(scores[0]), RISK_CATEGORIES[codes[0]]
+    
+    def classify(self, numeric_inputs):
+        """Tek hasta icin kategori; `MamdaniFIS.classify` ile ayni sonuc"""
+        columns = {var: [numeric_inputs.get(var, np.nan)] for var in self.variable_names}
+        return RISK_CATEGORIES[self.classify_batch(columns)[0]]
+
+
+def load_test_cases(filepath=TEST_FILE):
+    """Test dosyasini (kategorik girdiler, beklenen sinif) listelerine ayristirir"""
+    df = pd.read_csv(filepath, engine="python", on_bad_lines="skip", quoting=3)
+    cases, labels = [], []
     
     for idx in range(len(df)):
         row0, row1 = df.iloc[idx, 0], df.iloc[idx, 1]
@@ -214,18 +1108,44 @@ def evaluate():
                 k, v = p.split('=')
                 inputs[k.strip()] = TYPO_CORRECTIONS.get(v.strip(), v.strip())
         
-        expected = TYPO_CORRECTIONS.get(str(row1).replace('"', '').strip(), 
-                                         str(row1).replace('"', '').strip())
+        cases.append(inputs)
+        labels.append(TYPO_CORRECTIONS.get(str(row1).replace('"', '').strip(), 
+                                            str(row1).replace('"', '').strip()))
+    return cases, labels
+
+
+def categorical_columns(cases):
+    """Kategorik girdileri `infer_categorical` merkezleriyle sayisal sutunlara cevirir"""
+    columns = {var: np.full(len(cases), np.nan) for var in CATEGORY_CENTERS}
+    for i, inputs in enumerate(cases):
+        for var, term in inputs.items():
+            if var in CATEGORY_CENTERS and term in CATEGORY_CENTERS[var]:
+                columns[var][i] = CATEGORY_CENTERS[var][term]
+    return columns
+
+
+def evaluate():
+    print("=" * 60)
+    print("Kalp Hastaligi Risk Tahmin Sistemi")
+    print("Mamdani FIS + Hibrit Durulaştirma")
+    print("=" * 60)
+    
+    fis = MamdaniFIS()
+    print(f"\nKural sayisi: {fis.load_rules(RULES_FILE)}")
+    
+    cases, y_true = load_test_cases(TEST_FILE)
+    print(f"Test verisi: {len(cases)}")
+    
+    y_pred = []
+    for inputs in cases:
         _, prediction, _, _ = fis.infer_categorical(inputs)
-        
-        y_true.append(expected)
         y_pred.append(prediction)
     
     accuracy = accuracy_score(y_true, y_pred) * 100
     print(f"\nDogruluk: %{accuracy:.2f}")
     print("\n" + classification_report(y_true, y_pred, zero_division=0))
     
-    labels = ["Healthy", "LowRisk", "MediumRisk", "HighRisk"]
+    labels = RISK_CATEGORIES
     cm = confusion_matrix(y_true, y_pred, labels=labels)
     print("Karisiklik Matrisi:")
     print(f"{'':12} {'Healthy':>8} {'LowRisk':>8} {'MediumRisk':>10} {'HighRisk':>8}")
@@ -235,6 +1155,33 @@ def evaluate():
     return fis, accuracy
 
 
+def evaluate_tsk(fis=None):
+    """Test verisinde TSK ile hibrit Mamdani kategorilerinin uyumunu raporlar"""
+    if fis is None:
+        fis = MamdaniFIS()
+        fis.load_rules(RULES_FILE)
+    
+    cases, y_true = load_test_cases(TEST_FILE)
+    columns = categorical_columns(cases)
+    mamdani_scores, mamdani_codes = fis.infer_batch(columns)
+    tsk_scores, tsk_codes = fis.infer_tsk_batch(columns)
+    
+    agreement = np.mean(mamdani_codes == tsk_codes) * 100
+    y_tsk = [RISK_CATEGORIES[c] for c in tsk_codes]
+    y_mamdani = [RISK_CATEGORIES[c] for c in mamdani_codes]
+    print(f"TSK / Mamdani kategori uyumu: %{agreement:.2f}")
+    print(f"Ortalama skor farki: {np.mean(np.abs(tsk_scores - mamdani_scores)):.3f}")
+    print(f"Dogruluk - Mamdani: %{accuracy_score(y_true, y_mamdani) * 100:.2f}, "
+          f"TSK: %{accuracy_score(y_true, y_tsk) * 100:.2f}")
+    
+    cm = confusion_matrix(y_mamdani, y_tsk, labels=RISK_CATEGORIES)
+    print("Mamdani (satir) / TSK (sutun):")
+    print(f"{'':12} {'Healthy':>8} {'LowRisk':>8} {'MediumRisk':>10} {'HighRisk':>8}")
+    for i, l in enumerate(RISK_CATEGORIES):
+        print(f"{l:12} {cm[i,0]:>8} {cm[i,1]:>8} {cm[i,2]:>10} {cm[i,3]:>8}")
+    return agreement
+
+
 if __name__ == "__main__":
     evaluate()
     print("\n" + "=" * 60)
@@ -0,0 +1,200 @@
+"""
+Kural Analizi (Ablation)
+Her kural tek tek cikarildiginda test dogrulugunun nasil degistigini hesaplar
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from heart_disease_fuzzy_system import (MamdaniFIS, RULES_FILE, TEST_FILE, RISK_CATEGORIES,
+                                        RISK_THRESHOLDS, load_test_cases, categorical_columns)
+from telemetry import RuleFiringStats
+
+
+def activation_cache(fis, columns):
+    """Ornek x kural aktivasyon matrisi ve ablation icin gereken ara sonuclar.
+
+    Her sonuc kumesi icin en guclu kural (top1), onun degeri ve ikinci en guclu
+    aktivasyon (top2) tutulur. Bir kural cikarildiginda bir ornegin sonuc gucu
+    yalnizca o kural tek basina en gucluyse degisir ve yeni deger top2 olur.
+    """
+    compiled = fis.compile_rules()
+    cols, n = fis._batch_columns(columns)
+    memberships, present = fis.fuzzify_batch(cols)
+    activations = fis.evaluate_rules_batch(memberships)
+    strengths = fis.consequent_strengths(activations)
+    offsets = compiled['offsets']
+
+    n_cons = len(offsets) - 1
+    top_rule = np.full((n, n_cons), -1, dtype=np.intp)
+    second = np.zeros((n, n_cons))
+    for c in range(n_cons):
+        block = activations[:, offsets[c]:offsets[c + 1]]
+        if block.shape[1] == 0:
+            continue
+        top_rule[:, c] = offsets[c] + np.argmax(block, axis=1)
+        if block.shape[1] > 1:
+            second[:, c] = np.partition(block, block.shape[1] - 2, axis=1)[:, -2]
+
+    fallback = fis._fallback_scores_batch(memberships, present)
+    scores = fallback.copy()
+    fired = strengths.max(axis=1) > 0
+    if fired.any():
+        scores[fired] = fis.defuzzify_hybrid_batch(fis.aggregate_batch(strengths[fired]))
+
+    return {
+        'activations': activations,
+        'strengths': strengths,
+        'top_rule': top_rule,
+        'second': second,
+        'fallback': fallback,
+        'scores': scores,
+        'codes': np.searchsorted(RISK_THRESHOLDS, scores, side='right'),
+    }
+
+
+def ablate(fis, columns, labels=None, cache=None):
+    """Her kural icin tek basina cikarilma etkisi (leave-one-out).
+
+    Yalnizca kuralin tek en guclu oldugu (ornek, sonuc kumesi) ciftleri yeniden
+    durulastirilir; toplam is kural sayisindan degil ornek x sonuc kumesi
+    sayisindan etkilenir. Diziler `fis.rules` indeksine gore siralidir. Ayni
+    sonuca sahip yinelenen kurallar birbirini ortdugu icin tek tek sifir etki
+    gosterir.
+    """
+    if cache is None:
+        cache = activation_cache(fis, columns)
+    compiled = fis.compile_rules()
+    n_rules = compiled['n_rules']
+    activations, strengths = cache['activations'], cache['strengths']
+    top_rule, second = cache['top_rule'], cache['second']
+
+    top = np.take_along_axis(activations, np.maximum(top_rule, 0), axis=1)
+    unique = (top_rule >= 0) & (top > second)
+    samples, cons = np.nonzero(unique)
+
+    rows = strengths[samples].copy()
+    rows[np.arange(len(samples)), cons] = second[samples, cons]
+    new_scores = cache['fallback'][samples].copy()
+    fired = rows.max(axis=1) > 0
+    if fired.any():
+        new_scores[fired] = fis.defuzzify_hybrid_batch(fis.aggregate_batch(rows[fired]))
+    new_codes = np.searchsorted(RISK_THRESHOLDS, new_scores, side='right')
+
+    rules = top_rule[samples, cons]
+    changed = new_codes != cache['codes'][samples]
+    score_change = np.abs(new_scores - cache['scores'][samples])
+
+    def per_rule(values, reduce=np.add):
+        out = np.zeros(n_rules)
+        reduce.at(out, rules, values)
+        result = np.zeros(n_rules)
+        result[compiled['rule_ids']] = out
+        return result
+
+    fires = np.zeros(n_rules, dtype=np.int64)
+    fires[compiled['rule_ids']] = np.count_nonzero(activations > 0, axis=0)
+    result = {
+        'fires': fires,
+        'decisive': per_rule(np.ones(len(rules))).astype(np.int64),
+        'category_changes': per_rule(changed).astype(np.int64),
+        'max_score_change': per_rule(score_change, np.maximum),
+        'baseline_codes': cache['codes'],
+    }
+
+    if labels is not None:
+        truth = np.array([RISK_CATEGORIES.index(label) if label in RISK_CATEGORIES else -1
+                          for label in labels])
+        was_correct = cache['codes'][samples] == truth[samples]
+        now_correct = new_codes == truth[samples]
+        result['accuracy_change'] = (per_rule(now_correct.astype(float) - was_correct)
+                                     / len(truth))
+        result['baseline_accuracy'] = float(np.mean(cache['codes'] == truth))
+    return result
+
+
+def invalid_rules(fis):
+    """Tanimsiz degisken veya terim kullandigi icin hicbir girdide atesmeyen kurallar"""
+    compiled = fis.compile_rules()
+    term_counts = np.array([len(var.mfs) for var in fis.variables.values()])
+    broken = (compiled['term_index'] == (term_counts + 1)[:, None]).any(axis=0)
+    return np.sort(compiled['rule_ids'][broken])
+
+
+def rule_table(fis, result, firing_stats=None):
+    """Kural bazinda sonuclari DataFrame olarak dondurur.
+
+    `firing_stats` (RuleFiringStats) verilirse uretimdeki atesleme sayilari eklenir.
+    """
+    table = pd.DataFrame({
+        'antecedent': [' AND '.join(f"{v} = {t}" for v, t in r['antecedent'].items())
+                       for r in fis.rules],
+        'consequent': [r['consequent'] for r in fis.rules],
+        'fires': result['fires'],
+        'decisive': result['decisive'],
+        'category_changes': result['category_changes'],
+        'max_score_change': result['max_score_change'],
+    })
+    if 'accuracy_change' in result:
+        table['accuracy_change'] = result['accuracy_change']
+    if firing_stats is not None:
+        if firing_stats.n_rules != len(fis.rules):
+            raise ValueError("Atesleme istatistikleri farkli bir kural tabanina ait")
+        table['live_fires'] = firing_stats.fire_counts
+        table['live_mean_activation'] = firing_stats.mean_activation()
+        table['live_max_activation'] = firing_stats.max_activation
+    table['invalid'] = False
+    table.loc[invalid_rules(fis), 'invalid'] = True
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kural cikarma (ablation) analizi")
+    parser.add_argument("--rules", default=RULES_FILE)
+    parser.add_argument("--test", default=TEST_FILE)
+    parser.add_argument("--top", type=int, default=15, help="listelenecek en etkili kural sayisi")
+    parser.add_argument("--output", help="kural bazinda sonuclarin yazilacagi CSV dosyasi")
+    parser.add_argument("--firing-stats", nargs="+",
+                        help="RuleFiringStats.export ile yazilmis .npz dosyalari (birlestirilir)")
+    args = parser.parse_args(argv)
+
+    fis = MamdaniFIS()
+    fis.load_rules(args.rules)
+    cases, labels = load_test_cases(args.test)
+    result = ablate(fis, categorical_columns(cases), labels)
+    firing_stats = None
+    if args.firing_stats:
+        firing_stats = RuleFiringStats.load(args.firing_stats[0])
+        for path in args.firing_stats[1:]:
+            firing_stats.merge(RuleFiringStats.load(path))
+    table = rule_table(fis, result, firing_stats)
+
+    print(f"Kural sayisi: {len(fis.rules)}, test verisi: {len(cases)}")
+    print(f"Temel dogruluk: %{result['baseline_accuracy'] * 100:.2f}")
+    print(f"Test verisinde hic atesmeyen kural: {int((table['fires'] == 0).sum())}")
+    print(f"Hicbir ornekte tek belirleyici olmayan kural: {int((table['decisive'] == 0).sum())}")
+    invalid = table.index[table['invalid']]
+    print(f"Gecersiz degisken/terim iceren kural: {len(invalid)} {list(invalid)[:20]}")
+    if firing_stats is not None:
+        unused = (table['live_fires'] == 0) & (table['fires'] == 0)
+        print(f"Uretimde ({firing_stats.evaluations} degerlendirme) hic atesmeyen kural: "
+              f"{int((table['live_fires'] == 0).sum())}, test verisinde de atesmeyen: {int(unused.sum())}")
+
+    ranked = table[table['category_changes'] > 0].sort_values(
+        ['accuracy_change', 'category_changes'], ascending=[True, False])
+    print(f"\nCikarildiginda kategori degistiren kural: {len(ranked)}")
+    print(f"{'kural':>6} {'dogruluk':>9} {'kategori':>9} {'maks. skor':>11}  sonuc")
+    for idx, row in ranked.head(args.top).iterrows():
+        print(f"{idx:>6} {row['accuracy_change'] * 100:>+8.2f}% {row['category_changes']:>9} "
+              f"{row['max_score_change']:>11.3f}  {row['consequent']}")
+
+    if args.output:
+        table.to_csv(args.output, index_label="rule")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Aralik Sorgusu
+Girdileri yalnizca aralik olarak bilinen hastalar icin risk skorunun kutu uzerindeki
+en dusuk ve en yuksek degeri (dal-sinir); derlenmis model (`MamdaniFIS.compile()`) uzerinde
+"""
+
+import heapq
+
+import numpy as np
+
+from heart_disease_fuzzy_system import MAX_RISK_SCORE
+
+
+class BoxBounds:
+    """Girdi kutularinda `infer` skorunun kesin alt/ust sinirlari.
+
+    Orneklenmis MF'lerin aralik min/max seyrek tablolari bir kez kurulur.
+    MIN/MAX monoton oldugu icin kural ve sonuc kumesi aktivasyon araliklari alt
+    ve ust uyeliklerden toplu motorla elde edilir; hibrit skor siniri `classify`
+    ile ayni `CompiledFIS.score_bounds` ile hesaplanir.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.tables = {}
+        self.kinks = {}
+        for name, universe, mfs in zip(model.variable_names, model.universes, model.mfs):
+            n = mfs.shape[1]
+            index = np.arange(n)
+            maxs, mins, width = [mfs], [mfs], 1
+            while 2 * width <= n:
+                shifted = np.minimum(index + width, n - 1)
+                maxs.append(np.maximum(maxs[-1], maxs[-1][:, shifted]))
+                mins.append(np.minimum(mins[-1], mins[-1][:, shifted]))
+                width *= 2
+            self.tables[name] = {'max': np.array(maxs), 'min': np.array(mins)}
+            # MF kirilma noktalari: uyeliklerin uc degerleri burada olusur
+            bends = np.flatnonzero((np.abs(np.diff(mfs, 2, axis=1)) > 1e-12).any(axis=0)) + 1
+            self.kinks[name] = np.unique(np.concatenate((universe[[0, -1]], universe[bends])))
+
+    def membership_intervals(self, lows, highs):
+        """Girdi kutularinda her terim uyeliginin kesin alt/ust siniri.
+
+        Parcali dogrusal MF'nin bir araliktaki en kucuk ve en buyuk degeri uc
+        noktalarda veya aradaki evren noktalarinda olusur; ic noktalar seyrek
+        tablodan O(1) sorgulanir. `fuzzify_batch` ile ayni (N, terim+2) bicimi;
+        NaN alt sinir eksik girdi demektir.
+        """
+        mem_lo, mem_hi, present = [], [], []
+        for name, u, mfs in zip(self.model.variable_names, self.model.universes, self.model.mfs):
+            lo, hi = lows[name], highs[name]
+            tab = self.tables[name]
+            n_terms = len(mfs)
+            missing = np.isnan(lo)
+
+            at_lo = np.stack([np.interp(lo, u, mf, left=0.0, right=0.0) for mf in mfs], axis=1)
+            at_hi = np.stack([np.interp(hi, u, mf, left=0.0, right=0.0) for mf in mfs], axis=1)
+            low, high = np.minimum(at_lo, at_hi), np.maximum(at_lo, at_hi)
+
+            i1 = np.searchsorted(u, lo, side='right')
+            i2 = np.searchsorted(u, hi, side='left') - 1
+            inside = ~missing & (i2 >= i1)
+            if inside.any():
+                a, b = i1[inside], i2[inside]
+                level = np.floor(np.log2(b - a + 1)).astype(np.intp)
+                b = b - (1 << level) + 1
+                terms = np.arange(n_terms)
+                sel = (level[:, None], terms, a[:, None])
+                end = (level[:, None], terms, b[:, None])
+                low[inside] = np.minimum(low[inside], np.minimum(tab['min'][sel], tab['min'][end]))
+                high[inside] = np.maximum(high[inside], np.maximum(tab['max'][sel], tab['max'][end]))
+
+            m_lo = np.empty((len(lo), n_terms + 2))
+            m_hi = np.empty_like(m_lo)
+            m_lo[:, :-2], m_hi[:, :-2] = low, high
+            m_lo[missing, :-2] = m_hi[missing, :-2] = 0.0
+            m_lo[:, -2] = m_hi[:, -2] = 1.0
+            m_lo[:, -1] = m_hi[:, -1] = 0.0
+            mem_lo.append(m_lo)
+            mem_hi.append(m_hi)
+            present.append(~missing)
+        return mem_lo, mem_hi, present
+
+    def fallback_ranges(self, mem_lo, mem_hi, present):
+        """Kural atesmezse olusabilecek yedek skor araligi (baskin terim adaylarindan)"""
+        low = np.zeros(len(present[0]))
+        high = np.zeros(len(present[0]))
+        for m_lo, m_hi, p, w in zip(mem_lo, mem_hi, present, self.model.fallback_weights):
+            top = m_lo[:, :-2].max(axis=1, keepdims=True)
+            candidate = (m_hi[:, :-2] >= top) & (m_hi[:, :-2] > 0)
+            # Tum uyelikler sifirsa argmax ilk terimi secer
+            candidate[:, 0] |= top[:, 0] == 0
+            low += np.where(p, np.where(candidate, w, np.inf).min(axis=1), 0.0)
+            high += np.where(p, np.where(candidate, w, -np.inf).max(axis=1), 0.0)
+        return (np.minimum((low / MAX_RISK_SCORE) * 10, 10),
+                np.minimum((high / MAX_RISK_SCORE) * 10, 10))
+
+    def score_bounds(self, lows, highs, splits=8):
+        """Her girdi kutusu icin skorun alt/ust siniri.
+
+        `lows`/`highs` degisken adindan kutu sinirlarina eslemedir; NaN sinir
+        eksik girdi demektir. En genis sonuc kumesi aktivasyon araligi `splits`
+        parcaya bolunur ve parca sinirlarinin birlesimi alinir: tek kume atesleyen
+        kutularda zarf gevsekligi girdi bolmeyle degil bu bolmeyle kapanir.
+        """
+        model = self.model
+        mem_lo, mem_hi, present = self.membership_intervals(lows, highs)
+        s_lo = model.consequent_strengths(model.evaluate_rules_batch(mem_lo))
+        s_hi = model.consequent_strengths(model.evaluate_rules_batch(mem_hi))
+
+        lower = np.full(len(s_lo), np.inf)
+        upper = np.full(len(s_lo), -np.inf)
+        fired = np.flatnonzero(s_hi.max(axis=1) > 0)
+        if len(fired):
+            widest = np.argmax(s_hi[fired] - s_lo[fired], axis=1)
+            a, b = s_lo[fired, widest], s_hi[fired, widest]
+            cuts = a[:, None] + (b - a)[:, None] * np.linspace(0.0, 1.0, splits + 1)
+            # Parcalar araligi tam kaplasin: uclar yuvarlamadan etkilenmez
+            cuts[:, 0], cuts[:, -1] = a, b
+            part_lo = np.repeat(s_lo[fired], splits, axis=0)
+            part_hi = np.repeat(s_hi[fired], splits, axis=0)
+            flat = np.arange(len(part_lo))
+            column = np.repeat(widest, splits)
+            part_lo[flat, column] = cuts[:, :-1].ravel()
+            part_hi[flat, column] = cuts[:, 1:].ravel()
+            lo_parts, hi_parts = model.score_bounds(part_lo, upper=part_hi)
+            lower[fired] = lo_parts.reshape(-1, splits).min(axis=1)
+            upper[fired] = hi_parts.reshape(-1, splits).max(axis=1)
+        silent = s_lo.max(axis=1) == 0
+        if silent.any():
+            fb_lo, fb_hi = self.fallback_ranges(mem_lo, mem_hi, present)
+            lower[silent] = np.minimum(lower[silent], fb_lo[silent])
+            upper[silent] = np.maximum(upper[silent], fb_hi[silent])
+        return lower, upper
+
+
+def score_range(model, box, tol=0.01, max_boxes=20000, min_width=1e-6, batch=64):
+    """Girdi kutusu uzerinde en dusuk ve en yuksek risk skoru (dal-sinir).
+
+    `model` derlenmis modeldir (`fis.compile()`). `box` degisken adindan
+    (alt, ust) araligina veya sabit degere eslemedir; kutuda olmayan
+    degiskenler eksik girdi sayilir. Kutular sinirlari `BoxBounds` ile
+    hesaplanarak en genis (evrene gore) boyuttan bolunur; merkez noktalar
+    toplu motorla skorlanir. Her yon icin bulunan skor ve onu veren nokta
+    (sertifika), kanitlanmis sinir ve aradaki fark dondurulur. Fark `tol`
+    altina inmezse (or. skorun sicradigi noktalar) `converged` False olur.
+    """
+    names = list(model.variable_names)
+    for name in box:
+        if name not in names:
+            raise KeyError(f"Bilinmeyen degisken: {name}")
+    lo = np.full(len(names), np.nan)
+    hi = np.full(len(names), np.nan)
+    for i, name in enumerate(names):
+        if name not in box:
+            continue
+        bounds = box[name]
+        lo[i], hi[i] = (bounds, bounds) if np.ndim(bounds) == 0 else bounds
+        if not lo[i] <= hi[i]:
+            raise ValueError(f"'{name}' icin gecersiz aralik: {bounds}")
+
+    bounds = BoxBounds(model)
+    result = {'boxes': 0, 'converged': True}
+    for side, sign in (('min', -1.0), ('max', 1.0)):
+        score, point, bound, boxes, done = _branch_and_bound(
+            bounds, names, lo, hi, sign, tol, max_boxes, min_width, batch)
+        result[f'{side}_score'] = score
+        result[f'{side}_point'] = point
+        result[f'{side}_bound'] = bound
+        result['boxes'] += boxes
+        result['converged'] &= done
+    return result
+
+
+def _branch_and_bound(bounds, names, lo, hi, sign, tol, max_boxes, min_width, batch):
+    model = bounds.model
+    span = np.array([u[-1] - u[0] for u in model.universes], dtype=float)
+    varying = np.flatnonzero(hi > lo)
+    kinks = [bounds.kinks[v] for v in names]
+
+    def snapped(lows, highs):
+        """Kutu merkezine en yakin MF kirilma noktasi (kutu icindeyse)"""
+        points = (lows + highs) / 2
+        for i in varying:
+            k = kinks[i]
+            j = np.clip(np.searchsorted(k, points[:, i]), 1, len(k) - 1)
+            near = np.where(points[:, i] - k[j - 1] <= k[j] - points[:, i], k[j - 1], k[j])
+            inside = (near >= lows[:, i]) & (near <= highs[:, i])
+            points[:, i] = np.where(inside, near, points[:, i])
+        return points
+
+    def columns(points):
+        return {v: points[:, i] for i, v in enumerate(names)}
+
+    def evaluate(points):
+        scores = sign * model.infer_batch(columns(points))[0]
+        i = int(np.argmax(scores))
+        return scores[i], points[i]
+
+    def keys(lows, highs):
+        lower, upper = bounds.score_bounds(columns(lows), columns(highs))
+        return upper if sign > 0 else -lower
+
+    # Baslangic sertifikalari: kose noktalari, merkez ve merkeze en yakin kirilma noktasi
+    corners = np.repeat(lo[None, :], 1 << len(varying), axis=0)
+    for bit, i in enumerate(varying):
+        pick = (np.arange(len(corners)) >> bit) & 1 == 1
+        corners[pick, i] = hi[i]
+    best, best_point = evaluate(np.vstack([corners, (lo + hi) / 2, snapped(lo[None], hi[None])]))
+
+    heap, boxes, counter = [], 1, 0
+    stalled = pruned = -np.inf
+    key = keys(lo[None, :], hi[None, :])[0]
+    if key > best + tol:
+        heap.append((-key, counter, lo, hi))
+    else:
+        pruned = key
+
+    while heap and boxes < max_boxes:
+        parents = []
+        while heap and len(parents) < batch and -heap[0][0] > best + tol:
+            parents.append(heapq.heappop(heap))
+        if not parents:
+            break
+        lows, highs = [], []
+        for key, _, p_lo, p_hi in parents:
+            width = np.where(hi > lo, (p_hi - p_lo) / span, 0.0)
+            d = int(np.argmax(width))
+            if width[d] < min_width:
+                stalled = max(stalled, -key)
+                continue
+            mid = 0.5 * (p_lo[d] + p_hi[d])
+            left_hi, right_lo = p_hi.copy(), p_lo.copy()
+            left_hi[d], right_lo[d] = mid, mid
+            lows += [p_lo, right_lo]
+            highs += [left_hi, p_hi]
+        if not lows:
+            continue
+        lows, highs = np.array(lows), np.array(highs)
+        boxes += len(lows)
+
+        score, point = evaluate(np.vstack([(lows + highs) / 2, snapped(lows, highs)]))
+        if score > best:
+            best, best_point = score, point
+        for key, c_lo, c_hi in zip(keys(lows, highs), lows, highs):
+            if key > best + tol:
+                counter += 1
+                heapq.heappush(heap, (-key, counter, c_lo, c_hi))
+            else:
+                pruned = max(pruned, key)
+
+    open_bound = -heap[0][0] if heap else -np.inf
+    bound = max(best, stalled, pruned, open_bound)
+    point = {v: float(best_point[i]) for i, v in enumerate(names) if not np.isnan(best_point[i])}
+    done = bool(bound - best <= tol)
+    return float(sign * best), point, float(sign * bound), boxes, done
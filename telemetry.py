@@ -0,0 +1,354 @@
+"""
+Cikarim Telemetrisi
+Risk skoru, kategori, girdi dagilimlari ve kural atesleme icin sabit boyutlu, birlestirilebilir ozetler
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+
+class StreamingHistogram:
+    """Sabit aralikli, sabit boyutlu histogram tabanli kantil ozeti.
+
+    Deger araligi sinirli oldugu icin (risk skoru 0-10, girdiler kendi evrenleri)
+    kantil hatasi en fazla bir kutu genisligi kadardir. Bellek kullanimi gozlem
+    sayisindan bagimsizdir ve ayni kutulara sahip iki ozet toplanarak birlestirilir.
+    """
+
+    def __init__(self, lo, hi, n_bins):
+        if not hi > lo or n_bins < 1:
+            raise ValueError(f"Gecersiz histogram araligi: [{lo}, {hi}], {n_bins} kutu")
+        self.lo = float(lo)
+        self.hi = float(hi)
+        self.n_bins = int(n_bins)
+        self._scale = self.n_bins / (self.hi - self.lo)
+        self.counts = np.zeros(self.n_bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+        self.missing = 0
+        self.total = 0.0
+
+    @property
+    def count(self):
+        return int(self.counts.sum()) + self.underflow + self.overflow
+
+    def add(self, value):
+        value = float(value)
+        if value != value:
+            self.missing += 1
+            return
+        self.total += value
+        if value < self.lo:
+            self.underflow += 1
+        elif value > self.hi:
+            self.overflow += 1
+        else:
+            self.counts[min(int((value - self.lo) * self._scale), self.n_bins - 1)] += 1
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        nan = np.isnan(values)
+        self.missing += int(nan.sum())
+        values = values[~nan]
+        self.total += float(values.sum())
+        under = values < self.lo
+        over = values > self.hi
+        self.underflow += int(under.sum())
+        self.overflow += int(over.sum())
+        inside = values[~(under | over)]
+        idx = np.minimum(((inside - self.lo) * self._scale).astype(np.int64), self.n_bins - 1)
+        self.counts += np.bincount(idx, minlength=self.n_bins)
+
+    def _check_compatible(self, other):
+        if (self.lo, self.hi, self.n_bins) != (other.lo, other.hi, other.n_bins):
+            raise ValueError("Farkli kutulara sahip histogramlar birlestirilemez")
+
+    def merge(self, other):
+        self._check_compatible(other)
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        self.missing += other.missing
+        self.total += other.total
+        return self
+
+    def quantile(self, q):
+        """Kutu icinde dogrusal interpolasyonla yaklasik kantil (aralik disi degerler sinira sabitlenir)"""
+        n = self.count
+        if n == 0:
+            return float('nan')
+        cum = np.concatenate(([self.underflow], self.underflow + np.cumsum(self.counts)))
+        target = float(q) * n
+        if target <= cum[0]:
+            return self.lo
+        if target > cum[-1]:
+            return self.hi
+        i = int(np.searchsorted(cum, target, side='left')) - 1
+        in_bin = self.counts[i]
+        frac = (target - cum[i]) / in_bin if in_bin else 0.0
+        return float(self.lo + (i + frac) / self._scale)
+
+    def mean(self):
+        n = self.count
+        return self.total / n if n else float('nan')
+
+    def reset(self):
+        self.counts[:] = 0
+        self.underflow = self.overflow = self.missing = 0
+        self.total = 0.0
+
+    def to_dict(self):
+        return {'lo': self.lo, 'hi': self.hi, 'n_bins': self.n_bins,
+                'counts': self.counts.tolist(), 'underflow': self.underflow,
+                'overflow': self.overflow, 'missing': self.missing, 'total': self.total}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data['lo'], data['hi'], data['n_bins'])
+        hist.counts[:] = data['counts']
+        hist.underflow = data['underflow']
+        hist.overflow = data['overflow']
+        hist.missing = data['missing']
+        hist.total = data['total']
+        return hist
+
+
+class InferenceTelemetry:
+    """MamdaniFIS ciktilarinin cevrimici dagilim ozeti.
+
+    Skor kantilleri, kategori sayilari ve degisken bazinda girdi histogramlarini
+    tutar. `fis.telemetry` olarak baglandiginda her `infer` cagrisi kaydedilir.
+    Farkli sureclerden gelen ozetler `merge` ile birlestirilir, `export` ile
+    periyodik olarak JSON dosyasina yazilabilir.
+    """
+
+    def __init__(self, categories, input_ranges, score_range=(0.0, 10.0),
+                 score_bins=1000, input_bins=100):
+        self.categories = list(categories)
+        self._category_index = {c: i for i, c in enumerate(self.categories)}
+        self.category_counts = np.zeros(len(self.categories), dtype=np.int64)
+        self.score = StreamingHistogram(score_range[0], score_range[1], score_bins)
+        self.inputs = {var: StreamingHistogram(lo, hi, input_bins)
+                       for var, (lo, hi) in input_ranges.items()}
+
+    @classmethod
+    def for_fis(cls, fis, **kwargs):
+        """Degisken evrenleri ve cikis kategorileri verilen FIS'ten alinir"""
+        ranges = {name: (float(var.universe[0]), float(var.universe[-1]))
+                  for name, var in fis.variables.items()}
+        score_range = (float(fis.risk_universe[0]), float(fis.risk_universe[-1]))
+        return cls(fis.risk_mfs.keys(), ranges, score_range=score_range, **kwargs)
+
+    @property
+    def count(self):
+        return int(self.category_counts.sum())
+
+    def observe(self, numeric_inputs, score, category):
+        self.score.add(score)
+        self.category_counts[self._category_index[category]] += 1
+        for var, value in numeric_inputs.items():
+            hist = self.inputs.get(var)
+            if hist is not None:
+                hist.add(value)
+
+    def observe_batch(self, columns, scores, category_codes):
+        """Toplu skorlama sonucu; `category_codes` kategori listesindeki indekslerdir"""
+        self.score.add_many(scores)
+        self.category_counts += np.bincount(np.asarray(category_codes, dtype=np.int64),
+                                            minlength=len(self.categories))
+        for var, hist in self.inputs.items():
+            if var in columns:
+                hist.add_many(columns[var])
+
+    def merge(self, other):
+        if self.categories != other.categories or set(self.inputs) != set(other.inputs):
+            raise ValueError("Uyumsuz telemetri ozetleri birlestirilemez")
+        # Once tum histogramlar denetlenir; hata durumunda ozet degismeden kalir
+        self.score._check_compatible(other.score)
+        for var, hist in self.inputs.items():
+            hist._check_compatible(other.inputs[var])
+        self.category_counts += other.category_counts
+        self.score.merge(other.score)
+        for var, hist in self.inputs.items():
+            hist.merge(other.inputs[var])
+        return self
+
+    def reset(self):
+        self.category_counts[:] = 0
+        self.score.reset()
+        for hist in self.inputs.values():
+            hist.reset()
+
+    def summary(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95, 0.99)):
+        n = self.count
+        return {
+            'count': n,
+            'score_mean': self.score.mean(),
+            'score_quantiles': {q: self.score.quantile(q) for q in quantiles},
+            'categories': {c: int(k) for c, k in zip(self.categories, self.category_counts)},
+            'category_rates': {c: (int(k) / n if n else 0.0)
+                               for c, k in zip(self.categories, self.category_counts)},
+            'input_medians': {var: hist.quantile(0.5) for var, hist in self.inputs.items()},
+        }
+
+    def to_dict(self):
+        return {'categories': self.categories,
+                'category_counts': self.category_counts.tolist(),
+                'score': self.score.to_dict(),
+                'inputs': {var: hist.to_dict() for var, hist in self.inputs.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        tel = cls(data['categories'], {})
+        tel.category_counts[:] = data['category_counts']
+        tel.score = StreamingHistogram.from_dict(data['score'])
+        tel.inputs = {var: StreamingHistogram.from_dict(h) for var, h in data['inputs'].items()}
+        return tel
+
+    def export(self, path, reset=False):
+        """Ozeti JSON olarak yazar; `reset=True` ile periyodik pencereler olusturulur"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+        if reset:
+            self.reset()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+class RuleFiringStats:
+    """Kural bazinda atesleme sayisi, aktivasyon toplami ve en yuksek aktivasyon.
+
+    Diziler kural sayisi kadar onceden ayrilir ve `fis.rules` indeksine gore
+    siralidir. `fis.rule_stats` olarak baglandiginda tekil ve toplu skorlama
+    yollari kaydedilir (Monte Carlo ve aralik sorgusu ornekleri haric).
+    Guncellemeler bir kilitle korunur, bu nedenle ayni nesne birden cok is
+    parcacigindan beslenebilir. Surecler arasi ozetler `merge` ile birlestirilir,
+    `export` ile sikistirilmis .npz dosyasina yazilir.
+    """
+
+    def __init__(self, n_rules):
+        self.n_rules = int(n_rules)
+        self.evaluations = 0
+        self.fire_counts = np.zeros(self.n_rules, dtype=np.int64)
+        self.activation_sums = np.zeros(self.n_rules)
+        self.max_activation = np.zeros(self.n_rules)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_fis(cls, fis):
+        """Kural sayisi verilen FIS'ten alinir (kurallar yuklenmis olmali)"""
+        return cls(len(fis.rules))
+
+    def observe(self, rules, activations, n_rules):
+        """Tek degerlendirme; `rules` atesleyen kurallarin `fis.rules` indeksleri.
+
+        `n_rules` degerlendirilen kural tabaninin boyutudur; ozetinkiyle ayni olmalidir.
+        """
+        if n_rules != self.n_rules:
+            raise ValueError(f"Kural tabani {n_rules} kural iceriyor, "
+                             f"ozet {self.n_rules} kural icin olusturuldu")
+        with self._lock:
+            self.evaluations += 1
+            if len(rules):
+                rules = np.asarray(rules, dtype=np.intp)
+                activations = np.asarray(activations, dtype=float)
+                self.fire_counts[rules] += 1
+                self.activation_sums[rules] += activations
+                self.max_activation[rules] = np.maximum(self.max_activation[rules], activations)
+
+    def observe_batch(self, activations, rule_ids, repeats=None):
+        """(N, kural) aktivasyon matrisi; sutun j `fis.rules[rule_ids[j]]` kuralidir.
+
+        `repeats` tekillestirilmis satirlarin kac ozgun satiri temsil ettigidir.
+        """
+        if activations.shape[1] != self.n_rules:
+            raise ValueError(f"Aktivasyon matrisi {activations.shape[1]} kural iceriyor, "
+                             f"ozet {self.n_rules} kural icin olusturuldu")
+        if repeats is None:
+            evaluations = len(activations)
+            counts = np.count_nonzero(activations, axis=0)
+            sums = activations.sum(axis=0)
+        else:
+            repeats = np.asarray(repeats)
+            evaluations = int(repeats.sum())
+            counts = repeats @ (activations > 0)
+            sums = repeats.astype(float) @ activations
+        peak = activations.max(axis=0) if len(activations) else np.zeros(self.n_rules)
+
+        with self._lock:
+            self.evaluations += evaluations
+            self.fire_counts[rule_ids] += counts
+            self.activation_sums[rule_ids] += sums
+            self.max_activation[rule_ids] = np.maximum(self.max_activation[rule_ids], peak)
+
+    def merge(self, other):
+        if self.n_rules != other.n_rules:
+            raise ValueError("Farkli kural sayisina sahip ozetler birlestirilemez")
+        with self._lock:
+            self.evaluations += other.evaluations
+            self.fire_counts += other.fire_counts
+            self.activation_sums += other.activation_sums
+            np.maximum(self.max_activation, other.max_activation, out=self.max_activation)
+        return self
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self.evaluations = 0
+        self.fire_counts[:] = 0
+        self.activation_sums[:] = 0.0
+        self.max_activation[:] = 0.0
+
+    def never_fired(self):
+        """Hic atesmeyen kurallarin `fis.rules` indeksleri"""
+        return np.flatnonzero(self.fire_counts == 0)
+
+    def mean_activation(self):
+        """Atesledigi degerlendirmelerde ortalama aktivasyon (atesmeyenler icin 0)"""
+        return self.activation_sums / np.maximum(self.fire_counts, 1)
+
+    def summary(self, top=10):
+        n = self.evaluations
+        order = np.argsort(-self.fire_counts, kind='stable')[:top]
+        return {
+            'evaluations': n,
+            'rules': self.n_rules,
+            'fired_rules': int(np.count_nonzero(self.fire_counts)),
+            'never_fired': int(self.n_rules - np.count_nonzero(self.fire_counts)),
+            'top_rules': {int(r): (int(self.fire_counts[r]) / n if n else 0.0) for r in order},
+        }
+
+    def export(self, path, reset=False):
+        """Sikistirilmis .npz olarak yazar; `reset=True` ile periyodik pencereler olusturulur"""
+        with self._lock:
+            arrays = {'evaluations': np.int64(self.evaluations),
+                      'fire_counts': self.fire_counts.copy(),
+                      'activation_sums': self.activation_sums.copy(),
+                      'max_activation': self.max_activation.copy()}
+            # Kopya ile sifirlama ayni kilit altinda: araya giren gozlemler kaybolmaz
+            if reset:
+                self._clear()
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            stats = cls(len(data['fire_counts']))
+            stats.evaluations = int(data['evaluations'])
+            stats.fire_counts[:] = data['fire_counts']
+            stats.activation_sums[:] = data['activation_sums']
+            stats.max_activation[:] = data['max_activation']
+        return stats